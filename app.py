@@ -1,10 +1,17 @@
 import streamlit as st
 from io import BytesIO
 import base64
+import time
 from audiorecorder import audiorecorder
-from langgraph_config.graph_runner import run_pipeline
 from dotenv import load_dotenv
-load_dotenv()  # .env 파일 읽어서 환경변수 자동 등록
+load_dotenv()  # .env 파일 읽어서 환경변수 자동 등록 (설정은 import 시점에 읽어서 먼저)
+from langgraph_config.jobs import get_job_manager, QueueFullError
+from langgraph_config.audio_ingest import concat_audio, decode_audio
+from langgraph_config.streaming import BackgroundStream, iter_stream_updates
+from langgraph_config.warmup import start_warmup
+from langgraph_config.audio_transport import encode_for_browser
+from langgraph_config.pronunciation_module import iter_reference_chunks
+from langgraph_config.workers import inference_pool_enabled
 
 st.title("Pronunciation Coach 🎤")
 # Target Text 입력
@@ -19,11 +26,44 @@ input_method = st.radio("Choose input method:", ["Upload Audio File", "Record Au
 
 name = st.text_input("Your Name")
 
+# 스트리밍 인식: 음성을 프레임 단위로 넣으면서 partial 결과 / 청크 진행상황을 바로 보여줌
+# 녹음이 끝난 뒤 다시 흘려보내는 미리보기라 기본은 끔 (켜면 결과를 STT 캐시에 넣어서 job 과 공유)
+# 추론 워커 모드에서는 Vosk 가 워커에만 있고 인식 결과도 워커 캐시로 못 넘겨서 끔
+pool_mode = inference_pool_enabled()
+live_mode = st.checkbox("Show live recognition", value=False, disabled=pool_mode,
+                        help="Not available while the inference worker pool is enabled" if pool_mode else None)
+live_mode = live_mode and not pool_mode
+
 # 상태 초기화
 if "audio_file" not in st.session_state:
     st.session_state.audio_file = None
 if "audio_name" not in st.session_state:
     st.session_state.audio_name = None
+if "job_id" not in st.session_state:
+    st.session_state.job_id = None
+if "previews" not in st.session_state:
+    st.session_state.previews = {}
+
+# 프로세스 공용 job 큐 (세션들이 같이 씀, 꽉 차면 새 요청은 거절)
+job_manager = get_job_manager()
+
+# 모델 / 그래프는 백그라운드에서 미리 로드 (화면은 바로 뜨고, 준비 전에 보낸 요청은 로드가 끝나면 실행)
+warmup_status = start_warmup().status()
+with st.sidebar:
+    st.write("### Model status")
+    if warmup_status["ready"]:
+        st.success("Ready")
+    for component, info in warmup_status["components"].items():
+        if info["status"] == "ready":
+            st.caption(f"✅ {component} ({info['seconds']}s)")
+        elif info["status"] == "failed" and info.get("optional"):
+            st.caption(f"⚠️ {component} (optional): {info['error']}")
+        elif info["status"] == "failed":
+            st.caption(f"❌ {component}: {info['error']}")
+        else:
+            st.caption(f"⏳ {component} ({info['status']})")
+    if not warmup_status["finished"]:
+        st.button("Refresh status")
 
 # ------------------------------
 # 1️⃣ 오디오 업로드 선택
@@ -69,32 +109,134 @@ col1, col2 = st.columns([3, 1])
 with col2:
     send_clicked = st.button("Send to LangGraph")
 
+def live_updates(target_text, audio_bytes):
+    # 디코딩도 백그라운드에서 (결과는 디코딩 캐시에 남아서 job 이 다시 디코딩 안 함)
+    yield from iter_stream_updates(target_text, decode_audio(audio_bytes))
+
 # 결과는 전체 폭 컨테이너에서 출력   
 if send_clicked:
         audio_file = st.session_state.audio_file
         audio_name = st.session_state.audio_name
 
         if name and target_text and audio_file:
-            # 실제 LangGraph 처리 함수 호출 자리
-            result = run_pipeline(audio_file, name, target_text)  # 🚀 LangGraph 실행
-            st.write("### LangGraph Result")
-            st.json(result) # 결과 dict 보여주기 
-
-            #print("Debug run_pipeline : ",result)
-
-            # US TTS 음성 재생
-            us_audio_bytes = result.get("us_audio")
-            if us_audio_bytes:
-                st.audio(us_audio_bytes, format="audio/wav")
-
-            st.write("### UK Tutor Feedback")
-            st.markdown(result.get("uk_comment", "No UK comment available"))
-
-            # UK TTS 음성 재생 (가짜일 경우 빈 바이트 체크)
-            uk_audio_bytes = result.get("uk_audio")
-            if uk_audio_bytes:
-                st.audio(uk_audio_bytes, format="audio/wav")
+            # job 스레드와 미리보기가 같은 파일 객체를 동시에 읽지 않도록 bytes 로 한번만 읽어둠
+            audio_bytes = audio_file.getvalue()
+
+            # 실제 LangGraph 처리는 job 큐에 넣고 바로 리턴 (UI 스레드 안 막힘) 🚀
+            try:
+                st.session_state.job_id = job_manager.submit(audio_bytes, name, target_text)
+            except QueueFullError:
+                # 거절된 요청은 미리보기(TTS / 인식)도 돌리지 않음
+                st.error("Too many evaluations are running right now. Please try again in a moment.")
+                st.stop()
+
+            # 받아준 job 만 미리보기 실행 - 백그라운드 스레드에서 돌고 아래 polling 에서 화면만 갱신
+            previews = {}
+            # US 튜터 참조 음성을 합성 단위별로 먼저 재생 (합성 결과는 단위별 캐시에 들어가서 job 이 다시 합성 안 함)
+            # (추론 워커 모드에서는 모델이 워커에만 있어서 생략)
+            if not pool_mode:
+                previews["reference"] = BackgroundStream(iter_reference_chunks, target_text, "us")
+            # 스트리밍 인식 결과
+            if live_mode:
+                previews["live"] = BackgroundStream(live_updates, target_text, audio_bytes)
+            st.session_state.previews = previews
 
         else:
             st.warning("Please enter your name and upload/record an audio file!")
 
+# ------------------------------
+# 4️⃣ job 진행상황 / 결과
+# ------------------------------
+# 스크립트가 다시 실행돼도 session_state 의 job_id 로 이어서 polling
+def render_previews(previews, slots):
+    """백그라운드 미리보기의 지금까지 결과를 화면에 반영 (UI 스레드에서는 그리기만)"""
+    reference = previews.get("reference")
+    if reference is not None:
+        parts = reference.items
+        state = (len(parts), reference.error)
+        if state != slots.get("reference_state"):
+            slots["reference_state"] = state
+            # 플레이어 하나를 합성된 조각까지 이어붙인 음성으로 계속 교체
+            with slots["reference"].container():
+                if parts:
+                    ref_bytes, ref_mime = encode_for_browser(concat_audio([audio for _, _, audio in parts]))
+                    st.audio(ref_bytes, format=ref_mime)
+                    st.caption(" / ".join(text for _, text, _ in parts) + ("" if reference.done else " …"))
+                if reference.error:
+                    st.caption(f"Reference audio unavailable: {reference.error}")
+
+    live = previews.get("live")
+    if live is not None:
+        update = live.latest
+        if update is not None:
+            slots["live_text"].markdown(f"**{update['text']}** _{update['partial']}_")
+            slots["live_chunks"].table([
+                {"chunk": c["chunk"], "heard": f"{c['heard']}/{c['size']}", "score": c["score"]}
+                for c in update["chunks"]
+            ])
+        if live.error:
+            slots["live_text"].caption(f"Live recognition unavailable: {live.error}")
+
+if st.session_state.job_id:
+    job_id = st.session_state.job_id
+    previews = st.session_state.previews
+    slots = {}
+    if "reference" in previews:
+        st.write("### US Tutor Reference")
+        slots["reference"] = st.empty()
+    if "live" in previews:
+        st.write("### Live Recognition")
+        slots["live_text"] = st.empty()
+        slots["live_chunks"] = st.empty()
+
+    progress = st.progress(0.0, text="Queued...")
+    if st.button("Cancel evaluation"):
+        job_manager.cancel(job_id)
+
+    try:
+        while True:
+            render_previews(previews, slots)
+            info = job_manager.poll(job_id)
+            if info["status"] == "queued":
+                progress.progress(0.0, text=f"Queued (position {info['queue_position'] + 1})")
+            elif info["status"] == "running":
+                done = ", ".join(info["stages_done"]) or "starting"
+                progress.progress(info["progress"], text=f"Running... ({done})")
+            else:
+                break
+            time.sleep(0.5)
+    except KeyError:
+        info = {"status": "failed", "error": "Job expired"}
+
+    # job 이 먼저 끝나도 미리보기는 마지막 상태까지 보여줌
+    for preview in previews.values():
+        preview.wait(5.0)
+    render_previews(previews, slots)
+    progress.empty()
+    st.session_state.job_id = None
+    st.session_state.previews = {}
+
+    if info["status"] == "done":
+        result = info["result"]
+        st.write("### LangGraph Result")
+        # 결과 dict 보여주기 (음성 bytes 는 JSON 으로 안 보냄)
+        st.json({k: v for k, v in result.items() if k not in ("us_audio", "uk_audio")})
+
+        #print("Debug run_pipeline : ",result)
+
+        # US TTS 음성 재생
+        us_audio_bytes = result.get("us_audio")
+        if us_audio_bytes:
+            st.audio(us_audio_bytes, format=result.get("us_audio_mime") or "audio/wav")
+
+        st.write("### UK Tutor Feedback")
+        st.markdown(result.get("uk_comment", "No UK comment available"))
+
+        # UK TTS 음성 재생 (TTS 가 없으면 None)
+        uk_audio_bytes = result.get("uk_audio")
+        if uk_audio_bytes:
+            st.audio(uk_audio_bytes, format=result.get("uk_audio_mime") or "audio/wav")
+    elif info["status"] == "cancelled":
+        st.info("Evaluation cancelled.")
+    else:
+        st.error(f"Evaluation failed: {info.get('error')}")
@@ -0,0 +1,239 @@
+# benchmarks/bench_pipeline.py
+# 평가 파이프라인 벤치마크 (재현 가능: 합성 음성 + 고정 시드)
+#
+#   python benchmarks/bench_pipeline.py                       # 전체 시나리오 실행 + 결과 출력
+#   python benchmarks/bench_pipeline.py --save-baseline       # 결과를 baseline 으로 저장
+#   python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json   # baseline 대비 회귀 체크
+#
+# 시나리오 = (입력 경로: run_pipeline / evaluate_pronunciation) x 음성 길이 x 목표문장 길이 x 동시성
+# 결과: p50/p95/p99 지연, 처리량(req/s), 시나리오 동안의 peak RSS / 증가량
+#
+# pipeline 모드의 결과 저장은 임시 DB 로 감 (RESULTS_DB_PATH 를 직접 주면 그걸 사용)
+#
+# 기본(--cache cold)은 요청마다 PCM 을 살짝 바꿔서 디코딩 / STT 캐시에 안 걸리게 함
+# (같은 wav 를 계속 보내면 두번째부터는 캐시 조회만 재게 됨) - 캐시 적중 경로는 --cache warm
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 패키지 import 전에 지정해야 results_store 가 실제 speakback.db 대신 이걸 씀
+_tmp_dir = tempfile.TemporaryDirectory(prefix="bench-")
+os.environ.setdefault("RESULTS_DB_PATH", os.path.join(_tmp_dir.name, "bench.db"))
+
+SAMPLE_RATE = 16000
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# 음성 길이(초), 목표 문장 단어 수, 동시 요청 수
+UTTERANCE_SECONDS = (5, 30, 120)
+TARGET_WORDS = (8, 40, 150)
+CONCURRENCY = (1, 4)
+
+# 목표 문장은 이 단어들을 순서대로 반복해서 만듦 (기능어/축약 포함)
+_WORDS = (
+    "i am going to the store because we want to buy some fresh bread and "
+    "she should have called her friend before the meeting but they could have waited for us at the station"
+).split()
+
+
+# ---------------- 입력 생성 ----------------
+def make_target_text(n_words: int) -> str:
+    return " ".join(_WORDS[i % len(_WORDS)] for i in range(n_words))
+
+def make_utterance(seconds: float, seed: int = 0) -> np.ndarray:
+    """
+    말소리 비슷한 합성 신호 (16kHz mono int16)
+    - 음절 속도(~4Hz)로 켜졌다 꺼지는 배음 + 약한 잡음, 문장 사이 무음
+    - 시드 고정이라 매번 같은 파형
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = 120 + 30 * np.sin(2 * np.pi * 0.3 * t)               # 억양처럼 천천히 변하는 기본주파수
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)    # 음절 envelope
+    pauses = (np.sin(2 * np.pi * t / 6.0) > -0.8).astype(np.float32)  # 6초마다 짧은 쉼
+    signal = voiced * syllables * pauses + 0.02 * rng.standard_normal(n)
+    signal = signal / max(1e-6, np.max(np.abs(signal))) * 0.6
+    return (signal * 32767).astype(np.int16)
+
+# 시나리오가 바뀌어도 겹치지 않게 프로세스 전체에서 증가
+_variants = itertools.count(1)
+
+def vary_utterance(pcm: np.ndarray, index: int) -> np.ndarray:
+    """첫 샘플만 바꾼 사본 (소리는 그대로, PCM 해시는 요청마다 다름)"""
+    out = pcm.copy()
+    out[0] = np.int16(index % 32768)
+    return out
+
+def to_wav_bytes(pcm: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+# ---------------- 측정 ----------------
+def percentile(values, q):
+    return float(np.percentile(np.asarray(values, dtype=np.float64), q)) if values else 0.0
+
+def run_scenario(mode: str, pcm: np.ndarray, target_text: str, concurrency: int, requests: int,
+                 cold_tts: bool, cache: str = "cold") -> dict:
+    from langgraph_config.audio_ingest import decode_audio
+    from langgraph_config.graph_runner import run_pipeline
+    from langgraph_config.pronunciation_module import evaluate_pronunciation, tts_cache, _joined_cache
+    from langgraph_config.profiling import _rss_sampler
+
+    warm_bytes = to_wav_bytes(pcm)
+
+    def one_request(_):
+        # cold: 요청마다 다른 PCM → 디코딩 / STT 캐시 miss, 동시 요청끼리 single-flight 로 합쳐지지도 않음
+        wav_bytes = to_wav_bytes(vary_utterance(pcm, next(_variants))) if cache == "cold" else warm_bytes
+        if cold_tts:
+            tts_cache.memory.clear()
+            _joined_cache.clear()
+        started = time.perf_counter()
+        if mode == "pipeline":
+            audio_file = io.BytesIO(wav_bytes)
+            audio_file.name = "bench.wav"
+            result = run_pipeline(audio_file, "bench", target_text)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+        else:
+            evaluate_pronunciation(target_text, decode_audio(wav_bytes), "us")
+        return time.perf_counter() - started
+
+    # 워밍업 1회 (모델 로드 / 그래프 컴파일 제외)
+    one_request(None)
+
+    # ru_maxrss 는 프로세스 전체 최대값이라 앞 시나리오 값이 계속 남음 → 이 시나리오 동안만 샘플링
+    rss_token = _rss_sampler.begin()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one_request, range(requests)))
+    wall = time.perf_counter() - wall_start
+    rss_start, rss_peak = _rss_sampler.end(rss_token)
+
+    return {
+        "requests": requests,
+        "p50_sec": round(percentile(latencies, 50), 4),
+        "p95_sec": round(percentile(latencies, 95), 4),
+        "p99_sec": round(percentile(latencies, 99), 4),
+        "mean_sec": round(float(np.mean(latencies)), 4),
+        "throughput_rps": round(requests / wall, 4) if wall > 0 else 0.0,
+        "peak_rss_mb": round(rss_peak, 1),
+        "rss_growth_mb": round(rss_peak - rss_start, 1),
+    }
+
+def scenario_name(mode, seconds, words, concurrency):
+    return f"{mode}/audio={seconds}s/target={words}w/c={concurrency}"
+
+
+# ---------------- baseline 비교 ----------------
+def compare(results: dict, baseline: dict, tolerance: float):
+    """p95 지연 / 처리량 / 메모리가 tolerance 이상 나빠진 시나리오 목록"""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if cur["p95_sec"] > base["p95_sec"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_sec']}s → {cur['p95_sec']}s")
+        if cur["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} → {cur['throughput_rps']} req/s")
+        if cur["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak rss {base['peak_rss_mb']} → {cur['peak_rss_mb']} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="발음 평가 파이프라인 벤치마크")
+    parser.add_argument("--modes", nargs="+", default=["evaluate", "pipeline"], choices=["evaluate", "pipeline"])
+    parser.add_argument("--seconds", nargs="+", type=float, default=list(UTTERANCE_SECONDS))
+    parser.add_argument("--words", nargs="+", type=int, default=list(TARGET_WORDS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=list(CONCURRENCY))
+    parser.add_argument("--requests", type=int, default=8, help="시나리오당 요청 수")
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold",
+                        help="cold: 요청마다 다른 PCM (디코딩/STT 실제 수행), warm: 같은 wav 반복 (캐시 적중)")
+    parser.add_argument("--cold-tts", action="store_true", help="요청마다 TTS 메모리 캐시(청크 + 합친 음성) 비우기")
+    parser.add_argument("--vosk-mode", choices=["open", "grammar"], help="STT 인식 모드 (기본: VOSK_MODE 환경변수)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 baseline JSON")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="결과를 baseline 으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="허용 악화 비율 (기본 15%%)")
+    args = parser.parse_args(argv)
+
+    if args.vosk_mode:
+        from langgraph_config import pronunciation_module
+        pronunciation_module.VOSK_MODE = args.vosk_mode
+
+    results = {}
+    for seconds in args.seconds:
+        pcm = make_utterance(seconds, seed=int(seconds))
+        for words in args.words:
+            target_text = make_target_text(words)
+            for mode in args.modes:
+                for concurrency in args.concurrency:
+                    name = scenario_name(mode, int(seconds), words, concurrency)
+                    res = run_scenario(mode, pcm, target_text, concurrency, args.requests,
+                                       args.cold_tts, args.cache)
+                    results[name] = res
+                    print(f"{name:45s} p50={res['p50_sec']:.3f}s p95={res['p95_sec']:.3f}s "
+                          f"p99={res['p99_sec']:.3f}s {res['throughput_rps']:.2f} req/s "
+                          f"rss={res['peak_rss_mb']}MB (+{res['rss_growth_mb']})")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "requests_per_scenario": args.requests,
+            "cache": args.cache,
+            "cold_tts": args.cold_tts,
+            "vosk_mode": args.vosk_mode or os.getenv("VOSK_MODE", "open"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline 저장: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base_report = json.load(f)
+        baseline = base_report["results"]
+        base_cache = base_report.get("meta", {}).get("cache", "warm")   # cache 기록 전 baseline 은 warm
+        if base_cache != args.cache:
+            print(f"주의: baseline 은 --cache {base_cache}, 이번 실행은 --cache {args.cache} (비교 의미 없음)")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\n성능 회귀:")
+            for r in regressions:
+                print("  -", r)
+            return 1
+        print("\nbaseline 대비 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+# benchmarks/import_budget.py
+# import 시간 예산 체크 (앱 시작을 느리게 만드는 무거운 import 가 다시 들어오지 않게)
+#
+#   python benchmarks/import_budget.py                     # 모듈별 import 시간 + 예산 초과 / 금지 모듈 체크
+#   python benchmarks/import_budget.py --top 10            # 가장 느린 import 10개 (-X importtime)
+#   python benchmarks/import_budget.py --output import_times.json
+#
+# 모듈마다 새 인터프리터에서 측정 (이미 import 된 모듈 캐시 영향 X), 여러 번 돌려서 최소값 사용
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 모듈 → import 시간 예산 (ms)
+BUDGETS_MS = {
+    "langgraph_config.jobs": 500,          # app.py 가 시작할 때 import 하는 경로
+    "langgraph_config.streaming": 500,
+    "langgraph_config.graph_runner": 500,
+    "langgraph_config.warmup": 100,
+}
+
+# import 만으로 올라오면 안 되는 모듈 (웜업 / 첫 요청에서 로드)
+FORBIDDEN = ("torch", "TTS", "vosk", "whisper", "scipy.signal", "langgraph")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+def measure(module: str, repeat: int) -> dict:
+    runs = []
+    loaded = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, forbidden=FORBIDDEN)],
+            capture_output=True, text=True, cwd=ROOT, env=_env(),
+        )
+        if out.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{out.stderr.strip()}")
+        rec = json.loads(out.stdout.strip().splitlines()[-1])
+        runs.append(rec["ms"])
+        loaded = rec["loaded"]
+    return {"ms": round(min(runs), 1), "forbidden_loaded": loaded}
+
+def slowest_imports(module: str, top: int):
+    """-X importtime 결과에서 누적 시간이 큰 import 목록 [(ms, 모듈)]"""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT, env=_env(),
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative) / 1000.0, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="import 시간 예산 체크")
+    parser.add_argument("--modules", nargs="+", default=list(BUDGETS_MS), help="측정할 모듈")
+    parser.add_argument("--repeat", type=int, default=3, help="모듈당 측정 횟수 (최소값 사용)")
+    parser.add_argument("--scale", type=float, default=1.0, help="예산 배율 (느린 CI 머신용)")
+    parser.add_argument("--top", type=int, default=0, help="모듈별로 가장 느린 import N 개 출력")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args(argv)
+
+    results = {}
+    failures = []
+    for module in args.modules:
+        res = measure(module, args.repeat)
+        budget = BUDGETS_MS.get(module)
+        res["budget_ms"] = budget * args.scale if budget else None
+        results[module] = res
+
+        status = "ok"
+        if res["budget_ms"] is not None and res["ms"] > res["budget_ms"]:
+            status = "OVER BUDGET"
+            failures.append(f"{module}: {res['ms']}ms > {res['budget_ms']}ms")
+        if res["forbidden_loaded"]:
+            status = "HEAVY IMPORT"
+            failures.append(f"{module}: imports {', '.join(res['forbidden_loaded'])}")
+        print(f"{module:35s} {res['ms']:8.1f} ms  (budget {res['budget_ms']} ms)  {status}")
+
+        for ms, name in slowest_imports(module, args.top) if args.top else []:
+            print(f"    {ms:8.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if failures:
+        print("\nimport 예산 초과:")
+        for f in failures:
+            print("  -", f)
+        return 1
+    print("\nimport 예산 안쪽")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
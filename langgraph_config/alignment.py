@@ -0,0 +1,154 @@
+# langgraph_config/alignment.py
+# 목표 문장 토큰 ↔ Vosk 인식 단어 정렬 (edit distance) + 청크별 시간 / 속도 점수
+# - 같은 단어가 여러 번 나와도 위치별로 따로 매칭 (conf_dict 처럼 한 항목으로 합쳐지지 않음)
+# - 어순이 틀리면 매칭 안 됨 (삭제 + 삽입으로 처리)
+# - DP 는 행 단위 NumPy 연산이라 긴 지문 / 배치 채점에서도 빠름
+import os
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from .scoring import TOKEN_RE
+
+# 사용자/참조 청크 시간 비율이 이 범위 안이면 속도 만점 (1/PACE_TOLERANCE ~ PACE_TOLERANCE)
+PACE_TOLERANCE = float(os.getenv("PACE_TOLERANCE", "1.5"))
+# 이 비율(배)만큼 벗어나면 속도 점수 0
+PACE_LIMIT = float(os.getenv("PACE_LIMIT", "3.0"))
+
+# backtrace 연산 코드
+OP_MATCH, OP_SUB, OP_DEL, OP_INS = 0, 1, 2, 3
+
+
+class Alignment(NamedTuple):
+    """목표 토큰 위치별 정렬 결과 (길이 = 목표 토큰 수)"""
+    target: Tuple[str, ...]
+    hyp_index: np.ndarray    # 매칭된 인식 단어 index (정확히 같은 단어), 없으면 -1
+    conf: np.ndarray         # 매칭된 단어 confidence, 없으면 0
+    start: np.ndarray        # 매칭된 단어 시작(초), 없으면 nan
+    end: np.ndarray          # 매칭된 단어 끝(초), 없으면 nan
+    substitutions: int
+    deletions: int
+    insertions: int
+
+    @property
+    def matched(self) -> np.ndarray:
+        return self.hyp_index >= 0
+
+    @property
+    def distance(self) -> int:
+        return self.substitutions + self.deletions + self.insertions
+
+
+def _hyp_token(word: str) -> str:
+    tokens = TOKEN_RE.findall(word.lower())
+    return "".join(tokens)
+
+
+def edit_distance_matrix(target_ids: np.ndarray, hyp_ids: np.ndarray) -> np.ndarray:
+    """
+    Levenshtein DP 행렬 (n+1, m+1)
+    한 행씩: 대각선/위쪽은 벡터 연산, 왼쪽(삽입)은 누적 최소값으로 한번에
+      D[i, j] = min_k (D'[i, k] + (j - k))  =  minimum.accumulate(D'[i] - j) + j
+    """
+    n, m = len(target_ids), len(hyp_ids)
+    cols = np.arange(m + 1, dtype=np.int32)
+    d = np.empty((n + 1, m + 1), dtype=np.int32)
+    d[0] = cols
+    for i in range(1, n + 1):
+        prev = d[i - 1]
+        row = d[i]
+        row[0] = i
+        np.minimum(prev[:-1] + (hyp_ids != target_ids[i - 1]), prev[1:] + 1, out=row[1:])
+        np.minimum.accumulate(row - cols, out=row)
+        row += cols
+    return d
+
+
+def align_words(target_tokens, words) -> Alignment:
+    """
+    target_tokens: 목표 문장 토큰 (소문자)
+    words: Vosk 단어 리스트 [{"word", "conf", "start", "end"}, ...]
+    """
+    target = tuple(target_tokens)
+    hyp = [_hyp_token(w.get("word", "")) for w in words]
+    n, m = len(target), len(hyp)
+
+    # 단어 → 정수 id (비교를 정수 배열로)
+    vocab = {}
+    target_ids = np.fromiter((vocab.setdefault(t, len(vocab)) for t in target), dtype=np.int32, count=n)
+    hyp_ids = np.fromiter((vocab.setdefault(h, len(vocab)) for h in hyp), dtype=np.int32, count=m)
+    d = edit_distance_matrix(target_ids, hyp_ids)
+
+    hyp_index = np.full(n, -1, dtype=np.int32)
+    subs = dels = ins = 0
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            same = target_ids[i - 1] == hyp_ids[j - 1]
+            if d[i, j] == d[i - 1, j - 1] + (0 if same else 1):
+                if same:
+                    hyp_index[i - 1] = j - 1
+                else:
+                    subs += 1
+                i, j = i - 1, j - 1
+                continue
+        if i > 0 and d[i, j] == d[i - 1, j] + 1:
+            dels += 1
+            i -= 1
+        else:
+            ins += 1
+            j -= 1
+
+    conf_all = np.fromiter((w.get("conf", 0.0) for w in words), dtype=np.float32, count=m)
+    start_all = np.fromiter((w.get("start", np.nan) for w in words), dtype=np.float64, count=m)
+    end_all = np.fromiter((w.get("end", np.nan) for w in words), dtype=np.float64, count=m)
+    matched = hyp_index >= 0
+    idx = np.where(matched, hyp_index, 0)
+    conf = np.where(matched, conf_all[idx] if m else 0.0, 0.0).astype(np.float32)
+    start = np.where(matched, start_all[idx] if m else np.nan, np.nan)
+    end = np.where(matched, end_all[idx] if m else np.nan, np.nan)
+    return Alignment(target, hyp_index, conf, start, end, subs, dels, ins)
+
+
+# -----------------------------
+# 청크별 시간 / 속도
+# -----------------------------
+def chunk_bounds(chunks) -> np.ndarray:
+    """청크별 [시작, 끝) 토큰 위치 → shape (k, 2)"""
+    sizes = np.fromiter((len(c) for c in chunks), dtype=np.int64, count=len(chunks))
+    ends = np.cumsum(sizes)
+    return np.stack([ends - sizes, ends], axis=1) if len(sizes) else np.empty((0, 2), dtype=np.int64)
+
+
+def user_chunk_durations(alignment: Alignment, bounds: np.ndarray) -> np.ndarray:
+    """청크 안에서 매칭된 첫 단어 시작 ~ 마지막 단어 끝 (매칭 없으면 nan)"""
+    out = np.full(len(bounds), np.nan)
+    for k, (lo, hi) in enumerate(bounds):
+        starts = alignment.start[lo:hi]
+        ends = alignment.end[lo:hi]
+        if np.isfinite(starts).any():
+            out[k] = np.nanmax(ends) - np.nanmin(starts)
+    return out
+
+
+def estimate_ref_chunk_durations(chunks, ref_duration: float) -> np.ndarray:
+    """참조 음성 청크 시간 추정 - 글자 수 비율로 전체 길이를 나눔"""
+    weights = np.fromiter((sum(len(w) for w in c) + len(c) for c in chunks), dtype=np.float64, count=len(chunks))
+    total = weights.sum()
+    if total <= 0:
+        return np.zeros(len(chunks))
+    return ref_duration * weights / total
+
+
+def pace_scores(user_sec: np.ndarray, ref_sec: np.ndarray,
+                tolerance: float = PACE_TOLERANCE, limit: float = PACE_LIMIT):
+    """
+    청크별 (시간 비율 user/ref, 속도 점수 0~1)
+    비율이 tolerance 배 안이면 1, limit 배에서 0 (로그 스케일 선형 감소), 시간 정보 없으면 nan
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where((ref_sec > 0) & (user_sec > 0), user_sec / ref_sec, np.nan)
+        off = np.abs(np.log(ratio))
+    lo, hi = np.log(tolerance), np.log(limit)
+    score = np.clip(1.0 - (off - lo) / (hi - lo), 0.0, 1.0)
+    return ratio, score
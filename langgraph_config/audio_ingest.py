@@ -0,0 +1,173 @@
+# langgraph_config/audio_ingest.py
+# 업로드 음성을 한번만 디코딩해서 16kHz mono int16 버퍼로 만들어두는 단계
+# (Vosk, 길이 계산, 채점 모두 이 버퍼를 같이 읽음)
+import hashlib
+import importlib.util
+import io
+import os
+import subprocess
+import wave
+from dataclasses import dataclass, field
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+
+from .cache import LRUByteCache
+
+# scipy.signal 은 import 만 1초 가까이 걸려서 실제로 리샘플링할 때 import
+SCIPY_AVAILABLE = importlib.util.find_spec("scipy") is not None
+
+TARGET_SAMPLE_RATE = 16000
+
+# 같은 파일을 다시 올리면 디코딩(ffmpeg 포함)을 건너뛰도록 원본 바이트 해시 → DecodedAudio
+DECODE_CACHE_MAX_MB = int(os.getenv("DECODE_CACHE_MAX_MB", "32"))
+_decode_cache = LRUByteCache(DECODE_CACHE_MAX_MB * 1024 * 1024)
+
+
+@dataclass
+class DecodedAudio:
+    """mono int16 PCM (사용자 음성은 16kHz, 튜터 참조 음성은 TTS 모델 sample rate)"""
+    pcm: np.ndarray
+    sample_rate: int = TARGET_SAMPLE_RATE
+    _hash: str = field(default=None, init=False, repr=False, compare=False)
+    _encoded: dict = field(default_factory=dict, init=False, repr=False, compare=False)  # 포맷 → (bytes, mime)
+
+    @property
+    def num_samples(self) -> int:
+        return int(self.pcm.shape[0])
+
+    @property
+    def duration(self) -> float:
+        """길이(초) - 다시 디코딩하지 않고 샘플 수로 계산"""
+        return self.num_samples / float(self.sample_rate)
+
+    def speech_duration(self, threshold: float = 0.02) -> float:
+        """앞뒤 무음을 뺀 길이(초) - 피크의 threshold 배보다 작은 샘플은 무음으로 봄"""
+        if self.num_samples == 0:
+            return 0.0
+        level = np.abs(self.pcm.astype(np.int32))
+        loud = np.flatnonzero(level > max(1, int(level.max() * threshold)))
+        if loud.size == 0:
+            return 0.0
+        return float(loud[-1] - loud[0] + 1) / self.sample_rate
+
+    def content_hash(self) -> str:
+        """디코딩된 16kHz mono PCM 기준 sha256 (업로드 파일 메타데이터와 무관, 한번만 계산)"""
+        if self._hash is None:
+            self._hash = hashlib.sha256(self.pcm_bytes()).hexdigest()
+        return self._hash
+
+    def pcm_bytes(self) -> memoryview:
+        """Vosk AcceptWaveform 에 넘길 raw bytes (복사 없이)"""
+        return memoryview(np.ascontiguousarray(self.pcm)).cast("B")
+
+    def to_wav_bytes(self) -> bytes:
+        """wav 헤더만 붙임 (재인코딩 X)"""
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(self.pcm_bytes())
+        return buf.getvalue()
+
+    @classmethod
+    def from_wav_bytes(cls, wav_bytes: bytes) -> "DecodedAudio":
+        """16bit mono wav → DecodedAudio (헤더만 읽고 PCM 은 그대로)"""
+        with wave.open(io.BytesIO(wav_bytes), "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                raise ValueError("16bit mono wav 만 지원합니다")
+            pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            return cls(pcm=pcm, sample_rate=wf.getframerate())
+
+
+def concat_audio(parts) -> DecodedAudio:
+    """같은 sample rate 의 PCM 들을 이어붙임 (wav/압축 재인코딩 없이 샘플만 복사)"""
+    parts = list(parts)
+    if not parts:
+        raise ValueError("이어붙일 음성이 없습니다")
+    sample_rate = parts[0].sample_rate
+    if any(p.sample_rate != sample_rate for p in parts):
+        raise ValueError("sample rate 가 다른 음성은 이어붙일 수 없습니다")
+    pcm = np.concatenate([p.pcm for p in parts])
+    pcm.flags.writeable = False
+    return DecodedAudio(pcm=pcm, sample_rate=sample_rate)
+
+
+def _read_source(source) -> bytes:
+    """경로 / bytes / BytesIO / Streamlit UploadedFile 모두 bytes 로"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source.read()
+
+
+def _to_int16(samples: np.ndarray) -> np.ndarray:
+    samples = np.clip(samples, -1.0, 1.0)
+    return (samples * 32767.0).astype(np.int16)
+
+
+def _resample(samples: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    if orig_sr == target_sr:
+        return samples
+    if SCIPY_AVAILABLE:
+        from scipy.signal import resample_poly
+        g = gcd(orig_sr, target_sr)
+        return resample_poly(samples, target_sr // g, orig_sr // g).astype(np.float32)
+    # scipy 가 없으면 선형보간
+    n_out = int(round(len(samples) * target_sr / orig_sr))
+    x_old = np.arange(len(samples), dtype=np.float64)
+    x_new = np.linspace(0, len(samples) - 1, n_out) if n_out > 0 else np.empty(0)
+    return np.interp(x_new, x_old, samples).astype(np.float32)
+
+
+def _decode_in_process(data: bytes) -> np.ndarray:
+    """libsndfile 로 디코딩 (wav/flac/ogg/mp3) → 16kHz mono int16"""
+    samples, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    mono = samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+    return _to_int16(_resample(mono, sr, TARGET_SAMPLE_RATE))
+
+
+def _decode_with_ffmpeg(data: bytes) -> np.ndarray:
+    """libsndfile 이 못 읽는 컨테이너(m4a 등)만 ffmpeg 한번 (임시파일 없이 pipe)"""
+    process = subprocess.run(
+        [
+            "ffmpeg",
+            "-i", "pipe:0",
+            "-ar", str(TARGET_SAMPLE_RATE),  # 16kHz
+            "-ac", "1",                      # mono
+            "-f", "s16le",                   # 헤더 없는 raw PCM
+            "pipe:1"
+        ],
+        input=data,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True
+    )
+    return np.frombuffer(process.stdout, dtype=np.int16)
+
+
+def decode_audio(source) -> DecodedAudio:
+    """
+    사용자 음성 → DecodedAudio (요청당 한번만 호출)
+    """
+    data = _read_source(source)
+    raw_key = hashlib.sha256(data).hexdigest()
+    cached = _decode_cache.get(raw_key)
+    if cached is not None:
+        return cached
+
+    try:
+        pcm = _decode_in_process(data)
+    except (RuntimeError, ValueError):
+        # soundfile 의 LibsndfileError 도 RuntimeError 계열
+        pcm = _decode_with_ffmpeg(data)
+    pcm.flags.writeable = False   # 캐시에서 여러 요청이 같이 보니까 읽기 전용
+    audio = DecodedAudio(pcm=pcm)
+    _decode_cache.put(raw_key, audio, pcm.nbytes)
+    return audio
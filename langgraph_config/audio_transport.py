@@ -0,0 +1,49 @@
+# langgraph_config/audio_transport.py
+# 브라우저로 보낼 음성 인코딩 (기본 wav, 선택적으로 OGG/Opus 로 압축)
+import io
+import os
+
+import soundfile as sf
+
+from .audio_ingest import DecodedAudio, _resample
+
+# "wav" 또는 "ogg" (OGG/Opus, wav 대비 보통 10배 이상 작음)
+AUDIO_TRANSPORT_FORMAT = os.getenv("AUDIO_TRANSPORT_FORMAT", "wav")
+OPUS_QUALITY = float(os.getenv("OPUS_QUALITY", "0.5"))   # 0.0(고음질) ~ 1.0(고압축)
+
+# Opus 가 받는 sample rate (TTS 22050Hz 는 24000Hz 로 올려서 인코딩)
+_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+MIME_TYPES = {"wav": "audio/wav", "ogg": "audio/ogg"}
+
+
+def _encode_ogg_opus(audio: DecodedAudio) -> bytes:
+    rate = next((r for r in _OPUS_RATES if r >= audio.sample_rate), 48000)
+    samples = audio.pcm.astype("float32") / 32768.0
+    samples = _resample(samples, audio.sample_rate, rate)
+    buf = io.BytesIO()
+    # 압축률은 생성자에서만 설정 가능 (SoundFile.compression_level 은 읽기 전용)
+    with sf.SoundFile(buf, "w", samplerate=rate, channels=1, format="OGG", subtype="OPUS",
+                      compression_level=OPUS_QUALITY) as f:
+        f.write(samples)
+    return buf.getvalue()
+
+
+def encode_for_browser(audio: DecodedAudio, fmt: str = None):
+    """DecodedAudio → (bytes, mime). 같은 객체는 한번만 인코딩 (TTS 캐시에서 나온 음성은 요청끼리 공유)"""
+    fmt = fmt or AUDIO_TRANSPORT_FORMAT
+    cache = audio._encoded
+    if fmt in cache:
+        return cache[fmt]
+
+    if fmt == "ogg":
+        try:
+            encoded = (_encode_ogg_opus(audio), MIME_TYPES["ogg"])
+        except (RuntimeError, ValueError, TypeError) as e:
+            # libsndfile 이 Opus 를 지원하지 않으면 wav 로
+            print(f"[audio_transport] OGG/Opus encode failed, falling back to wav: {e}")
+            encoded = (audio.to_wav_bytes(), MIME_TYPES["wav"])
+    else:
+        encoded = (audio.to_wav_bytes(), MIME_TYPES["wav"])
+    cache[fmt] = encoded
+    return encoded
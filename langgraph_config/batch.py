@@ -0,0 +1,262 @@
+# langgraph_config/batch.py
+# 여러 녹음 파일을 한번에 채점하는 배치 모드 (CLI + 함수 API)
+#
+#   python -m langgraph_config.batch manifest.csv -o results.jsonl --workers 4
+#
+# manifest: CSV(헤더 필요) 또는 JSONL, 컬럼 = audio_path, target_text, user (선택: id)
+# 결과는 항목 하나 끝날 때마다 바로 기록 → 중간에 끊겨도 같은 명령으로 다시 돌리면 이어서 진행
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# ---------------- manifest ----------------
+def item_id(row: dict) -> str:
+    """id 컬럼이 없으면 (audio_path, target_text, user) 로 안정적인 id 생성"""
+    if row.get("id"):
+        return str(row["id"])
+    key = "\x1f".join([row.get("audio_path", ""), row.get("target_text", ""), row.get("user", "")])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+def read_manifest(path: str):
+    """CSV / JSONL manifest → row dict 리스트"""
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    for row in rows:
+        if not row.get("audio_path") or not row.get("target_text"):
+            raise ValueError(f"audio_path / target_text 가 없는 행: {row}")
+        row["id"] = item_id(row)
+    return rows
+
+# ---------------- 결과 writer ----------------
+class JsonlWriter:
+    def __init__(self, path: str):
+        self.path = path
+
+    def done_ids(self):
+        done = set()
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 끊기면서 잘린 마지막 줄
+                if rec.get("status") == "ok":
+                    done.add(rec["id"])
+        return done
+
+    def __enter__(self):
+        self._f = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def write(self, rec: dict):
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+class ParquetWriter:
+    """Parquet 은 append 가 안돼서 디렉토리에 실행마다 part 파일을 새로 씀"""
+
+    def __init__(self, path: str, flush_every: int = 100):
+        self.path = path
+        self.flush_every = flush_every
+
+    def done_ids(self):
+        import pyarrow.parquet as pq
+        done = set()
+        for part in sorted(glob.glob(os.path.join(self.path, "part-*.parquet"))):
+            table = pq.read_table(part, columns=["id", "status"])
+            for rid, status in zip(table["id"].to_pylist(), table["status"].to_pylist()):
+                if status == "ok":
+                    done.add(rid)
+        return done
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._buffer = []
+        self._writer = None
+        self._part = os.path.join(self.path, f"part-{int(time.time() * 1000)}.parquet")
+        return self
+
+    def write(self, rec: dict):
+        # 중첩 구조(feedback, chunks)는 문자열 컬럼으로
+        row = {k: (json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v)
+               for k, v in rec.items()}
+        self._buffer.append(row)
+        if len(self._buffer) >= self.flush_every:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pylist(self._buffer, schema=_PARQUET_SCHEMA)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._part, table.schema)
+        self._writer.write_table(table)
+        self._buffer = []
+
+    def __exit__(self, *exc):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _parquet_schema():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    return pa.schema([
+        ("id", pa.string()), ("status", pa.string()), ("user", pa.string()),
+        ("audio_path", pa.string()), ("target_text", pa.string()),
+        ("score", pa.float64()), ("user_transcript", pa.string()),
+        ("user_duration", pa.float64()), ("ref_duration", pa.float64()),
+        ("feedback", pa.string()), ("target_chunks", pa.string()),
+        ("chunk_timings", pa.string()),
+        ("error", pa.string()), ("elapsed_sec", pa.float64()),
+    ])
+
+_PARQUET_SCHEMA = _parquet_schema()
+
+def make_writer(output: str, fmt: str = None):
+    fmt = fmt or ("parquet" if output.endswith(".parquet") else "jsonl")
+    if fmt == "parquet":
+        if _PARQUET_SCHEMA is None:
+            raise RuntimeError("parquet 출력에는 pyarrow 가 필요합니다")
+        return ParquetWriter(output)
+    return JsonlWriter(output)
+
+# ---------------- worker ----------------
+# --preload 로 부모에서 미리 올려도 되는 모델 (fork 해도 안전한 것만)
+# torch(TTS)는 스레드가 떠 있는 프로세스를 fork 하면 멈출 수 있어서 워커마다 따로 로드 (workers.py 참고)
+FORK_SAFE_PRELOAD = ("vosk_en_us",)
+
+def _init_worker(threads: int):
+    # 워커마다 torch/OpenMP 스레드를 코어 수 / 워커 수로 제한 (모델 로드 전에, InferencePool 과 같음)
+    # → 워커 N 개가 각자 코어 전부를 쓰려고 해서 생기는 oversubscription 방지
+    from .workers import apply_thread_budget
+    apply_thread_budget(threads)
+
+    # 워커 프로세스마다 모델은 처음 한번만 로드하고 이후 항목들이 재사용
+    from .model_registry import registry
+    registry.get("vosk_en_us")
+    registry.get("tts_us")
+
+def _pool_context(preload: bool):
+    """preload 면 fork (Vosk 메모리 공유), 아니면 spawn - torch 가 이미 올라간 프로세스는 항상 spawn"""
+    if preload and "fork" in mp.get_all_start_methods() and "torch" not in sys.modules:
+        return mp.get_context("fork")
+    return mp.get_context("spawn")
+
+def grade_item(row: dict) -> dict:
+    """manifest 한 행 채점 (워커 프로세스에서 실행)"""
+    from .audio_ingest import decode_audio
+    from .pronunciation_module import evaluate_pronunciation
+
+    started = time.perf_counter()
+    rec = {
+        "id": row["id"],
+        "user": row.get("user"),
+        "audio_path": row["audio_path"],
+        "target_text": row["target_text"],
+    }
+    try:
+        result = evaluate_pronunciation(row["target_text"], decode_audio(row["audio_path"]), "us")
+        rec.update({
+            "status": "ok",
+            "score": result["score"],
+            "user_transcript": result["user_transcript"],
+            "user_duration": result["user_duration"],
+            "ref_duration": result["ref_duration"],
+            "feedback": result["feedback"],
+            "target_chunks": result["target_chunks"],
+            "chunk_timings": result["chunk_timings"],
+            # 참조 음성(wav 바이트)은 결과 파일에 안 넣음
+        })
+    except Exception as e:
+        rec.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    rec["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    return rec
+
+# ---------------- 실행 ----------------
+def run_batch(rows, output: str, workers: int = None, fmt: str = None, preload: bool = False):
+    """
+    rows 를 프로세스 풀로 채점하면서 결과를 output 에 바로 기록
+    이미 성공한 id 는 건너뜀 (resume). 리턴: (처리 개수, 실패 개수, 건너뛴 개수)
+    워커마다 모델을 하나씩 따로 로드함 (워커 수 x 모델 메모리)
+    preload=True 면 fork 해도 안전한 Vosk 만 부모에서 먼저 올려두고 fork → 워커들이 그 메모리 페이지를 공유
+    (fork 를 못 쓰는 환경이면 preload 는 무시)
+    """
+    writer = make_writer(output, fmt)
+    done = writer.done_ids()
+    todo = [r for r in rows if r["id"] not in done]
+    skipped = len(rows) - len(todo)
+    if not todo:
+        return 0, 0, skipped
+
+    ctx = _pool_context(preload)
+    if ctx.get_start_method() == "fork":
+        from .model_registry import registry
+        for name in FORK_SAFE_PRELOAD:
+            registry.get(name)
+
+    from .workers import threads_per_worker
+    workers = workers or os.cpu_count() or 1
+    processed = failed = 0
+    with writer, ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=(threads_per_worker(workers),)) as pool:
+        pending = set()
+        it = iter(todo)
+        # 한번에 너무 많이 넘기지 않도록 (워커 수 x 2) 개씩만 in-flight
+        for row in it:
+            pending.add(pool.submit(grade_item, row))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                rec = fut.result()
+                writer.write(rec)
+                processed += 1
+                failed += rec["status"] != "ok"
+                print(f"[batch] {processed}/{len(todo)} {rec['id']} {rec['status']} {rec.get('score', '')}")
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.add(pool.submit(grade_item, nxt))
+    return processed, failed, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="발음 평가 배치 채점")
+    parser.add_argument("manifest", help="CSV(헤더: audio_path,target_text,user[,id]) 또는 JSONL")
+    parser.add_argument("-o", "--output", required=True, help="결과 경로 (.jsonl 또는 .parquet 디렉토리)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="기본값: 확장자로 판단")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--preload", action="store_true", help="fork 전에 부모에서 Vosk 모델 로드 (워커끼리 메모리 공유, TTS 는 워커마다 로드)")
+    args = parser.parse_args(argv)
+
+    rows = read_manifest(args.manifest)
+    processed, failed, skipped = run_batch(rows, args.output, args.workers, args.format, args.preload)
+    print(f"[batch] done: processed={processed} failed={failed} skipped(resume)={skipped}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,72 +1,78 @@
 # 그래프 정의부
 # langgraph_config/builder.py
-from langgraph.graph import StateGraph, START, END
-from .store import global_store
-import whisper
-import tempfile
-import soundfile as sf
-import io
-import torch
-from TTS.api import TTS
+from typing import Any, List, Optional, TypedDict
+import threading
 
 from .pronunciation_module import evaluate_pronunciation
-
-from langsmith import trace
-from langsmith.run_helpers import traceable
-
-from langsmith import traceable
-from langsmith.run_helpers import get_current_run_tree
-
-# 간단한 state 구조 (필요시 MessagesState 써도 됨)
-class PipelineState(dict):
-    @traceable
-    def __merge__(self, other):
-        merged = PipelineState(self)
-        decisions = {}
-        for k, v in other.items():
-            if k in merged:
-                decisions[k] = {"before": merged[k], "after": v, "action": "overwrite"}
-            else:
-                decisions[k] = {"before": None, "after": v, "action": "add"}
-            merged[k] = v
-        return {"decisions": decisions, "merged_state": dict(merged)}
-
-# Whisper 모델 (한번 로드 후 재사용) -- 필요없을거같아서 지움
-# ws_model = whisper.load_model("base")
-
-# 한번만 로드해서 재사용
-tts_us_model = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False, gpu=False)
-#tts_uk_model = TTS(model_name="tts_models/en/vctk/vits", progress_bar=False, gpu=False)
+from .audio_ingest import decode_audio, DecodedAudio
+from .profiling import profiled_node, stage
+from .results_store import get_results_store
+
+# 요청 단위 state - 요청별 데이터는 전부 여기로만 흐름 (전역 store / 공유 파일 X)
+# 노드는 자기가 바꾼 키만 리턴 → us/uk 튜터가 병렬로 돌아도 서로 안 덮어씀
+class PipelineState(TypedDict, total=False):
+    # 입력
+    request_id: str                    # 프로파일링 기록용 요청 id
+    user_name: str
+    target_text: str
+    audio_file: Any                    # BytesIO / UploadedFile (user_audio 를 바로 주면 생략)
+
+    # audio_store
+    user_audio: DecodedAudio           # 16kHz mono int16
+    err_txt: str
+
+    # us_tutor
+    score: float
+    us_feedback: List[str]
+    us_audio: Optional[DecodedAudio]   # reference 참고용 음성 (TTS PCM, 인코딩은 graph_runner 에서)
+    user_transcript: str
+    user_words: List[dict]             # 단어별 word/start/end/conf
+    target_chunks: List[List[str]]
+    user_duration: float               # 사용자 발화 시간
+    us_ref_duration: float             # us tutor 발화시간
+    chunk_timings: List[dict]          # 청크별 user/ref 시간, 속도 점수 (정렬 기반)
+
+    # uk_tutor
+    uk_score: float
+    uk_feedback: List[str]
+    uk_comment: str
+    uk_audio: Optional[DecodedAudio]   # 영국식 reference 음성 (VCTK 화자)
+    uk_ref_duration: float             # uk tutor 발화시간
+    uk_error: Optional[str]            # UK 튜터 실패 사유 (US 채점은 그대로)
+
+    # tts
+    tts_done: bool
+
+# 모델은 model_registry 에서 처음 쓸 때 한번만 로드해서 공유 (여기서 따로 로드 X)
 
 # ---------------- 노드 정의 ----------------
-def audio_store_node(state):
-    # 사용자 음성 데이터를 numpy + tensor 로 변환하고 Whisper STT 수행
-    audioFile = global_store.audio_file
+@profiled_node("audio_store")
+def audio_store_node(state: PipelineState):
+    # 사용자 음성을 한번만 디코딩해서 16kHz mono int16 버퍼로 저장 (이후 단계는 이 버퍼만 사용)
+    if state.get("user_audio") is not None:
+        return {}   # 추론 워커로 올 때는 이미 디코딩된 PCM (shared memory)
+    audioFile = state.get("audio_file")
     if audioFile is None:
-        state["err_txt"] = "[audio store ERROR] No audio data found"
-        return state
+        return {"err_txt": "[audio store ERROR] No audio data found"}
     
     try:
-        # 1) BytesIO → 임시 wav 파일 저장
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(audioFile.read())
-            tmp_path = tmp.name
-
-        global_store.tmp_path = tmp_path
+        with stage("decode"):
+            user_audio = decode_audio(audioFile)
 
     except Exception as e:
-        state["err_txt"] = f"[audio store ERROR] {e}"
-        return state
+        return {"err_txt": f"[audio store ERROR] {e}"}
 
-    return state
+    return {"user_audio": user_audio}
 
+@profiled_node("us_tutor")
 def us_tutor_node(state: PipelineState):
     """미국 튜터 피드백 + 음성 생성"""
-    target_text = global_store.target_text
+    if state.get("user_audio") is None:
+        return {}
 
     result = evaluate_pronunciation(
-        target_text, 
-        global_store.tmp_path,     # 사용자 임시 음성파일경로
+        state["target_text"], 
+        state["user_audio"],       # 디코딩된 사용자 음성
         "us"                       # tutor type
     )
 
@@ -74,52 +80,111 @@ def us_tutor_node(state: PipelineState):
     print("=== US Tutor Final Result ===")
     print("Score:\n", result["score"])
     print("Feedback:\n", result["feedback"])
-    print("TTS Audio Bytes Length:", len(result["reference_tts"]))
-
-    global_store.score = result["score"]
-    global_store.us_feedback = result["feedback"]
-    global_store.tts_us_audio = result["reference_tts"]
-    global_store.user_transcript = result["user_transcript"]
-    global_store.target_chunks = result["target_chunks"]
-    global_store.user_duration = result["user_duration"]
-    global_store.us_ref_duration = result["ref_duration"]
-
-    return state
-
+    if result["reference_tts"] is not None:
+        print("TTS Audio Duration:", result["ref_duration"])
+
+    return {
+        "score": result["score"],
+        "us_feedback": result["feedback"],
+        "us_audio": result["reference_tts"],
+        "user_transcript": result["user_transcript"],
+        "user_words": result["user_words"],
+        "target_chunks": result["target_chunks"],
+        "user_duration": result["user_duration"],
+        "us_ref_duration": result["ref_duration"],
+        "chunk_timings": result["chunk_timings"],
+    }
+
+@profiled_node("uk_tutor")
 def uk_tutor_node(state: PipelineState):
-    """영국 튜터 피드백"""
-
-    # 실제 AI 평가 로직은 여기서 audio_np 기반
-    global_store.tts_uk_comment = "[UK Tutor] Try softer vowels."
-    global_store.tts_uk_audio = b"fake-uk-audio-bytes"
-
-    print("=== [uk_tutor_node] Final State Snapshot ===")
-    """
-    for k, v in state.items():
-        if isinstance(v, (bytes, bytearray)):
-            print(f"{k}: <{len(v)} bytes>")
-        else:
-            print(f"{k}: {v}")
-    """
+    """영국 튜터 피드백 + 음성 생성 (us_tutor 와 병렬, 디코딩된 음성 / STT 결과는 공유)"""
+    if state.get("user_audio") is None:
+        return {}
 
-    return state
+    try:
+        result = evaluate_pronunciation(
+            state["target_text"],
+            state["user_audio"],
+            "uk"
+        )
+    except Exception as e:
+        # UK 음성(VCTK / espeak / 모델 다운로드) 문제로 US 채점까지 날리지 않게 여기서 끝냄
+        # uk_score 가 없으면 db 노드도 UK 기록은 건너뜀
+        print("DEBUG uk_tutor error:", e)
+        error = f"{type(e).__name__}: {e}"
+        return {
+            "uk_comment": f"[UK Tutor] UK feedback is unavailable right now ({error})",
+            "uk_error": error,
+        }
+
+    print("=== UK Tutor Final Result ===")
+    print("Score:\n", result["score"])
 
+    return {
+        "uk_score": result["score"],
+        "uk_feedback": result["feedback"],
+        "uk_comment": format_uk_comment(result["score"], result["feedback"]),
+        "uk_audio": result["reference_tts"],
+        "uk_ref_duration": result["ref_duration"],
+    }
+
+def format_uk_comment(score: float, feedback: List[str]) -> str:
+    """UK 튜터 코멘트 (화면 표시용 markdown)"""
+    lines = [f"[UK Tutor] Score: {score}"]
+    lines += [f"- {f}" for f in feedback]
+    return "\n".join(lines)
+
+@profiled_node("tts")
 def tts_node(state: PipelineState):
     # TTS는 이미 us/uk tutor에서 만든 걸 합쳐서 처리 가능
-    state["tts_done"] = True
-
     print("=== [tts_node] Final State Snapshot ===")
           
-    return state
+    return {"tts_done": True}
 
+@profiled_node("db")
 def db_save_node(state: PipelineState):
-    # DB 저장 시뮬레이션
-    print("=== [DB Save Node] Final State Snapshot ===")
+    # 결과 저장 - 큐에 넣기만 하고 바로 리턴 (실제 쓰기는 results_store 의 writer 스레드가 배치로)
+    if state.get("score") is None:
+        return {}
+
+    get_results_store().save_attempt(
+        user_name=state.get("user_name") or "anonymous",
+        target_text=state["target_text"],
+        score=state["score"],
+        transcript=state.get("user_transcript", ""),
+        feedback=state.get("us_feedback"),
+        words=state.get("user_words"),
+        user_duration=state.get("user_duration"),
+        ref_duration=state.get("us_ref_duration"),
+        tutor_type="us",
+        request_id=state.get("request_id"),
+        user_audio=state.get("user_audio"),
+    )
+    if state.get("uk_score") is not None:
+        # 같은 녹음 / 인식 결과를 UK 기준 점수로 한번 더 저장 (request_id 는 UNIQUE 라 접미사)
+        request_id = state.get("request_id")
+        get_results_store().save_attempt(
+            user_name=state.get("user_name") or "anonymous",
+            target_text=state["target_text"],
+            score=state["uk_score"],
+            transcript=state.get("user_transcript", ""),
+            feedback=state.get("uk_feedback"),
+            words=state.get("user_words"),
+            user_duration=state.get("user_duration"),
+            ref_duration=state.get("uk_ref_duration"),
+            tutor_type="uk",
+            request_id=f"{request_id}:uk" if request_id else None,
+            user_audio=state.get("user_audio"),
+        )
+    print("=== [DB Save Node] attempt queued ===")
    
-    return state
+    return {}
 
 # ---------------- 그래프 빌더 ----------------
 def build_graph():
+    # langgraph import 가 무거워서 그래프를 처음 만들 때 import (웜업에서 미리 해둠)
+    from langgraph.graph import StateGraph, START, END
+
     graph = StateGraph(PipelineState)
 
     graph.add_node("audio_store", audio_store_node)
@@ -139,3 +204,27 @@ def build_graph():
     # CompiledStateGraph.invoke(state) 내부에서 새로운 상태 객체를 만들거나 덮어쓰는 과정이 있어서 바깥으로 제대로 전달되지 않는 거예요
     # 컴파일을 여기서 안하기로함
     return graph.compile()
+
+# ---------------- 컴파일된 그래프 캐시 ----------------
+# 컴파일된 그래프는 상태를 안 가지고 있어서 여러 요청이 동시에 invoke 해도 됨
+# → 프로세스당 한번만 만들고 재사용
+_compiled_graph = None
+_compiled_graph_lock = threading.Lock()
+
+def get_compiled_graph(rebuild: bool = False):
+    """프로세스 공용 컴파일 그래프 (처음 호출 시 lazy 로 빌드, rebuild=True 면 새로 빌드)"""
+    global _compiled_graph
+    graph = _compiled_graph
+    if graph is not None and not rebuild:
+        return graph
+
+    with _compiled_graph_lock:
+        if _compiled_graph is None or rebuild:
+            _compiled_graph = build_graph()
+        return _compiled_graph
+
+def reset_compiled_graph():
+    """노드 구성이 바뀌었을 때 호출 → 다음 요청에서 다시 빌드"""
+    global _compiled_graph
+    with _compiled_graph_lock:
+        _compiled_graph = None
@@ -0,0 +1,175 @@
+# langgraph_config/cache.py
+# 메모리 LRU (바이트 예산) + 선택적 디스크 캐시
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 문장 정규화 (유니코드 NFC + 공백 정리)"""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+def make_key(*parts) -> str:
+    """여러 값을 묶어서 content-address 키(sha256) 생성"""
+    h = hashlib.sha256()
+    for p in parts:
+        if isinstance(p, str):
+            p = p.encode("utf-8")
+        h.update(len(p).to_bytes(8, "little"))
+        h.update(p)
+    return h.hexdigest()
+
+
+class LRUByteCache:
+    """총 바이트 수 기준으로 오래된 항목부터 버리는 LRU"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()   # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes:
+            return  # 예산보다 큰 항목은 메모리에 안 올림
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache:
+    """디렉토리에 key.suffix 파일로 저장 (재시작해도 유지)"""
+
+    def __init__(self, directory: str, suffix: str = ".bin"):
+        self.directory = directory
+        self.suffix = suffix
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        # 임시파일에 쓰고 rename → 동시에 써도 깨진 파일이 안 보임
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+class TTSCache:
+    """
+    튜터 참조 음성 캐시
+    - 키: (정규화 문장, 모델 이름, 튜터 타입)
+    - 값: DecodedAudio (mono int16 PCM, 길이는 샘플 수로 계산)
+    - 디스크에는 wav 로 저장 (PCM 에 헤더만 붙임)
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str = None):
+        self.memory = LRUByteCache(max_bytes)
+        self.disk = DiskCache(disk_dir, suffix=".wav") if disk_dir else None
+
+    @staticmethod
+    def key(text: str, model_name: str, tutor_type: str) -> str:
+        return make_key(normalize_text(text), model_name, tutor_type)
+
+    def get(self, key: str):
+        audio = self.memory.get(key)
+        if audio is not None:
+            return audio
+        if self.disk is not None:
+            wav_bytes = self.disk.get(key)
+            if wav_bytes is not None:
+                # audio_ingest 가 이 모듈을 import 해서 여기서 늦게 import
+                from .audio_ingest import DecodedAudio
+                audio = DecodedAudio.from_wav_bytes(wav_bytes)
+                self.memory.put(key, audio, audio.pcm.nbytes)
+                return audio
+        return None
+
+    def put(self, key: str, audio):
+        audio.pcm.flags.writeable = False   # 요청끼리 같은 버퍼를 공유
+        self.memory.put(key, audio, audio.pcm.nbytes)
+        if self.disk is not None:
+            self.disk.put(key, audio.to_wav_bytes())
+
+
+class STTCache:
+    """
+    STT 결과 캐시 (같은 녹음을 다시 채점할 때 Vosk 를 건너뜀)
+    - 키: (디코딩된 PCM 해시, 모델 식별자, 인식 모드)
+    - 값: (transcript, 단어 리스트[word/start/end/conf])
+    JSON 문자열로 보관 → 꺼낼 때마다 새 객체라 호출 쪽에서 수정해도 캐시가 안 바뀜
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str = None):
+        self.memory = LRUByteCache(max_bytes)
+        self.disk = DiskCache(disk_dir, suffix=".json") if disk_dir else None
+
+    @staticmethod
+    def key(pcm_hash: str, model_id: str, mode: str = "open") -> str:
+        return make_key(pcm_hash, model_id, mode)
+
+    def get(self, key: str):
+        raw = self.memory.get(key)
+        if raw is None and self.disk is not None:
+            raw = self.disk.get(key)
+            if raw is not None:
+                self.memory.put(key, raw, len(raw))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["text"], entry["words"]
+
+    def put(self, key: str, text: str, words):
+        raw = json.dumps({"text": text, "words": words}, ensure_ascii=False).encode("utf-8")
+        self.memory.put(key, raw, len(raw))
+        if self.disk is not None:
+            self.disk.put(key, raw)
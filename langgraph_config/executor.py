@@ -0,0 +1,37 @@
+# langgraph_config/executor.py
+# 요청들이 같이 쓰는 스레드 풀 (TTS / STT 같은 무거운 단계 병렬 실행용)
+# torch, vosk 는 연산 중 GIL 을 놓기 때문에 스레드로도 병렬 효과가 있음
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 동시에 돌릴 단계 수 (환경변수로 조절)
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "4"))
+
+_stage_executor = None
+_stage_executor_lock = threading.Lock()
+
+def get_stage_executor() -> ThreadPoolExecutor:
+    """프로세스 공용 단계 실행 풀 (처음 호출 시 생성)"""
+    global _stage_executor
+    if _stage_executor is None:
+        with _stage_executor_lock:
+            if _stage_executor is None:
+                _stage_executor = ThreadPoolExecutor(
+                    max_workers=STAGE_WORKERS,
+                    thread_name_prefix="stage",
+                )
+    return _stage_executor
+
+def submit_stage(fn, *args, **kwargs):
+    """공용 풀에 제출 (현재 contextvars 를 그대로 넘김 → 프로파일링 request_id 유지)"""
+    ctx = contextvars.copy_context()
+    return get_stage_executor().submit(ctx.run, fn, *args, **kwargs)
+
+def shutdown_stage_executor(wait: bool = True):
+    global _stage_executor
+    with _stage_executor_lock:
+        if _stage_executor is not None:
+            _stage_executor.shutdown(wait=wait)
+            _stage_executor = None
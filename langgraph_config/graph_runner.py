@@ -1,47 +1,114 @@
 # 그래프 실행부
 # langgraph_config/graph_runner.py
-from .builder import build_graph
-from .store import global_store
-# 간단한 state 구조 (필요시 MessagesState 써도 됨)
-class PipelineState(dict):
-    pass
+import uuid
 
-def run_pipeline(audio_file, user_name: str, target_text: str):
+from .audio_ingest import DecodedAudio, decode_audio
+from .audio_transport import encode_for_browser
+from .builder import get_compiled_graph
+from .profiling import profiler, stage
+from .workers import get_inference_pool, inference_pool_enabled
+
+# 화면으로 넘기지 않는 state 키 (디코딩된 PCM / 업로드 파일 / 단어 목록 같은 큰 값)
+_STATE_BLOBS = ("audio_file", "user_audio", "us_audio", "uk_audio", "user_words")
+
+
+def _encode_audio(audio):
+    """DecodedAudio → (bytes, mime). 이미 bytes 면 wav 로 보고 그대로"""
+    if audio is None:
+        return None, None
+    if isinstance(audio, DecodedAudio):
+        return encode_for_browser(audio)
+    return audio, "audio/wav"
+
+def _summarize_state(final_state: dict) -> dict:
+    """디버그 / JSON 표시용 state (큰 값은 빼고 요약만)"""
+    summary = {k: v for k, v in final_state.items() if k not in _STATE_BLOBS}
+    user_audio = final_state.get("user_audio")
+    if user_audio is not None:
+        summary["user_audio"] = {"duration": round(user_audio.duration, 3), "hash": user_audio.content_hash()}
+    summary["user_words"] = len(final_state.get("user_words") or [])
+    return summary
+
+
+def run_pipeline(audio_file, user_name: str, target_text: str, request_id: str = None):
+    request_id = request_id or uuid.uuid4().hex
+    if inference_pool_enabled():
+        return _run_pipeline_pooled(audio_file, user_name, target_text, request_id)
+    return run_pipeline_local(user_name, target_text, request_id, audio_file=audio_file)
+
+def _run_pipeline_pooled(audio_file, user_name: str, target_text: str, request_id: str):
+    """여기서 디코딩만 하고 그래프는 추론 워커 프로세스에서 실행 (PCM 은 shared memory 로)"""
+    try:
+        with stage("decode", request_id):
+            user_audio = decode_audio(audio_file)
+    except Exception:
+        # 디코딩 실패는 그래프의 audio_store 가 err_txt 로 정리하게 그대로 넘김
+        return run_pipeline_local(user_name, target_text, request_id, audio_file=audio_file)
+    try:
+        result = get_inference_pool().run_pipeline(user_audio, user_name, target_text, request_id)
+    except Exception as e:
+        print("DEBUG inference worker error:", e)
+        return {"error": str(e)}
+    finally:
+        profiler.maybe_export()   # 부모 쪽 기록 (decode)
+    # 부모에서 잰 decode 단계 + 워커에서 잰 그래프 단계
+    if "timings" in result:
+        result["timings"] = profiler.request_records(request_id) + result["timings"]
+    return result
+
+def run_pipeline_local(user_name: str, target_text: str, request_id: str,
+                       audio_file=None, user_audio: DecodedAudio = None):
+    """현재 프로세스에서 그래프 실행 (user_audio 를 주면 디코딩 단계는 건너뜀)"""
     try : 
+        # 요청별 데이터는 전부 state 로 넘김 (전역 store X → 동시 요청끼리 안 섞임)
         state = {
+            "request_id": request_id,
             "user_name": user_name,
             "target_text": target_text,
+            "audio_file": audio_file,
         }
-        print("DEBUG inputs:", state)
+        if user_audio is not None:
+            state["user_audio"] = user_audio
+        print("DEBUG inputs:", {"user_name": user_name, "target_text": target_text})
 
-        compiled_graph = build_graph()
-        global_store.audio_file = audio_file  # state가 아닌 store에 저장
-        global_store.audio_file.seek(0)  # Whisper 등에서 읽기 위해 포인터 처음으로
-        global_store.target_text = target_text
+        compiled_graph = get_compiled_graph()  # 프로세스당 한번만 컴파일
 
         print("DEBUG: run_graph 시작")
         
         final_state = compiled_graph.invoke(state)
+        us_audio, us_audio_mime = _encode_audio(final_state.get("us_audio"))
+        uk_audio, uk_audio_mime = _encode_audio(final_state.get("uk_audio"))
 
         # 👇 화면단으로 전달할 데이터 구조 확정
         result = {
+            "request_id": request_id,
             "user_name": user_name,
             "target_text": target_text,
-            "final_state": final_state,          # LangGraph state 결과
-            "us_audio": getattr(global_store, "tts_us_audio", None),  # US 튜터 TTS 음성
-            "uk_audio": getattr(global_store, "tts_uk_audio", None),  # UK 튜터 TTS 음성
-            "us_feedback": getattr(global_store, "us_feedback", ""), # UK 튜터 피드백
-            "uk_feedback": getattr(global_store, "uk_feedback", ""), # UK 튜터 피드백
-            "score": getattr(global_store, "score", ""), # 점수
-            "target_chunks": getattr(global_store, "target_chunks", ""), # 청크들
-            "user_duration": getattr(global_store, "user_duration", ""), # 청크들
-            "us_ref_duration": getattr(global_store, "us_ref_duration", ""), # 청크들
+            "final_state": _summarize_state(final_state),  # LangGraph state 결과 (음성 등 큰 값 제외)
+            "us_audio": us_audio,                # US 튜터 TTS 음성 (인코딩된 bytes)
+            "us_audio_mime": us_audio_mime,
+            "uk_audio": uk_audio,                # UK 튜터 TTS 음성
+            "uk_audio_mime": uk_audio_mime,
+            "us_feedback": final_state.get("us_feedback", ""), # US 튜터 피드백
+            "uk_comment": final_state.get("uk_comment", ""), # UK 튜터 피드백
+            "uk_score": final_state.get("uk_score", ""), # UK 기준 점수
+            "uk_error": final_state.get("uk_error"), # UK 튜터 실패 사유 (US 결과는 그대로)
+            "score": final_state.get("score", ""), # 점수
+            "target_chunks": final_state.get("target_chunks", ""), # 청크들
+            "user_duration": final_state.get("user_duration", ""), # 사용자 발화 시간
+            "us_ref_duration": final_state.get("us_ref_duration", ""), # us tutor 발화시간
+            "uk_ref_duration": final_state.get("uk_ref_duration", ""), # uk tutor 발화시간
+            "chunk_timings": final_state.get("chunk_timings", []), # 청크별 속도
+            "err_txt": final_state.get("err_txt"),
+            "timings": profiler.request_records(request_id), # 노드/단계별 wall, cpu, peak rss
 
         }
 
-        print("DEBUG final state:", final_state)
+        print("DEBUG final state:", result["final_state"])
         #print("DEBUG final state:", result)
         return result
     except Exception as e:
         print("DEBUG run_graph error:", e)
         return {"error": str(e)}
+    finally:
+        profiler.maybe_export()
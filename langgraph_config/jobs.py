@@ -0,0 +1,213 @@
+# langgraph_config/jobs.py
+# run_pipeline 을 감싸는 비동기 job 큐 (asyncio)
+# - submit / poll / await(wait) / cancel
+# - 큐 크기 제한 (꽉 차면 거절하거나 자리날 때까지 대기) → 몰릴 때 부하를 통제
+# - worker 수 설정 가능 (실제 추론은 스레드 풀에서 실행, 이벤트 루프는 안 막힘)
+#
+# Streamlit 처럼 동기 코드에서도 쓸 수 있게 이벤트 루프는 백그라운드 스레드 하나에서 돔
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .graph_runner import run_pipeline
+from .profiling import profiler
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))        # 동시에 실행할 job 수
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "16"))  # 대기열 최대 길이
+JOB_KEEP = int(os.getenv("JOB_KEEP", "256"))             # 끝난 job 결과 보관 개수
+
+# 그래프 노드 순서 (진행률 표시용)
+PIPELINE_STAGES = ("audio_store", "us_tutor", "uk_tutor", "tts", "db")
+
+
+class QueueFullError(RuntimeError):
+    """대기열이 꽉 차서 job 을 받을 수 없음"""
+
+
+class Job:
+    def __init__(self, job_id: str, args: tuple):
+        self.id = job_id
+        self.args = args
+        self.status = "queued"        # queued → running → done / failed / cancelled
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.done_event = None        # asyncio.Event (루프 안에서 생성)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+
+class JobManager:
+    def __init__(self, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_SIZE, runner=run_pipeline):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.runner = runner
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="job-loop", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    # ---------------- 이벤트 루프 ----------------
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [self._loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == "cancelled":
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+                try:
+                    result = await self._loop.run_in_executor(self._executor, self.runner, *job.args)
+                    if job.status != "cancelled":   # 실행 중 취소된 job 은 결과를 버림
+                        job.result = result
+                        job.status = "done"
+                except Exception as e:
+                    if job.status != "cancelled":
+                        job.status = "failed"
+                        job.error = f"{type(e).__name__}: {e}"
+                job.finished_at = time.time()
+            finally:
+                job.done_event.set()
+                self._queue.task_done()
+                self._forget_old()
+
+    def _forget_old(self):
+        with self._lock:
+            finished = [jid for jid, j in self._jobs.items() if j.finished]
+            for jid in finished[:max(0, len(finished) - JOB_KEEP)]:
+                del self._jobs[jid]
+
+    # ---------------- 비동기 API (루프 안에서) ----------------
+    async def submit_async(self, audio_file, user_name: str, target_text: str,
+                           block: bool = False, timeout: float = None) -> str:
+        job_id = uuid.uuid4().hex
+        # job id 를 run_pipeline 의 request_id 로 같이 씀 → 프로파일링 기록으로 진행률 표시
+        job = Job(job_id, (audio_file, user_name, target_text, job_id))
+        job.done_event = asyncio.Event()
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            if block:
+                await asyncio.wait_for(self._queue.put(job), timeout)
+            else:
+                self._queue.put_nowait(job)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFullError(f"대기열이 가득 찼습니다 (max={self.max_queue})") from None
+        return job.id
+
+    async def wait_async(self, job_id: str, timeout: float = None) -> dict:
+        job = self._get(job_id)
+        await asyncio.wait_for(job.done_event.wait(), timeout)
+        return self.poll(job_id)
+
+    # ---------------- 동기 API (Streamlit 등 다른 스레드에서) ----------------
+    def _call(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def submit(self, audio_file, user_name: str, target_text: str,
+               block: bool = False, timeout: float = None) -> str:
+        """job 등록 → job_id. 큐가 꽉 차면 QueueFullError (block=True 면 timeout 까지 대기)"""
+        return self._call(self.submit_async(audio_file, user_name, target_text, block, timeout))
+
+    def wait(self, job_id: str, timeout: float = None) -> dict:
+        """끝날 때까지 대기 후 poll 결과 리턴"""
+        return self._call(self.wait_async(job_id, timeout))
+
+    def poll(self, job_id: str) -> dict:
+        """현재 상태 스냅샷 (진행된 노드, 대기 순번 포함)"""
+        job = self._get(job_id)
+        info = {
+            "job_id": job.id,
+            "status": job.status,
+            "submitted_at": job.submitted_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "error": job.error,
+        }
+        if job.status == "queued":
+            with self._lock:
+                queued = [j for j in self._jobs.values() if j.status == "queued"]
+            info["queue_position"] = next((i for i, j in enumerate(queued) if j is job), 0)
+        if job.status == "running":
+            done = {r["stage"] for r in profiler.request_records(job.id)}
+            info["stages_done"] = [s for s in PIPELINE_STAGES if s in done]
+            info["progress"] = len(info["stages_done"]) / len(PIPELINE_STAGES)
+        if job.finished:
+            info["progress"] = 1.0
+            info["result"] = job.result
+        return info
+
+    def cancel(self, job_id: str) -> bool:
+        """대기 중이면 실행 안 함, 실행 중이면 결과를 버림 (이미 끝났으면 False)"""
+        job = self._get(job_id)
+        if job.finished:
+            return False
+        was_queued = job.status == "queued"
+        job.status = "cancelled"
+        if was_queued:
+            job.finished_at = time.time()
+            self._loop.call_soon_threadsafe(job.done_event.set)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": sum(j.status == "queued" for j in jobs),
+            "running": sum(j.status == "running" for j in jobs),
+        }
+
+    def _get(self, job_id: str) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"없는 job: {job_id}")
+        return job
+
+    def shutdown(self):
+        async def _stop_workers():
+            for t in self._tasks:
+                t.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._call(_stop_workers())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown(wait=False)
+
+
+# 프로세스 공용 job manager (처음 호출 시 생성)
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager()
+    return _job_manager
@@ -0,0 +1,155 @@
+# langgraph_config/model_registry.py
+# 프로세스 공용 모델 레지스트리
+# - 모델은 처음 쓸 때 로드 (import 시점 X)
+# - 한번 로드한 모델은 모든 모듈/요청이 같이 씀
+# - 메모리 예산을 넘으면 가장 오래 안 쓴 모델부터 내림
+import os
+import threading
+import time
+
+# 전체 모델 메모리 예산 (MB)
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "4096"))
+
+# 모델 경로/이름
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "vosk-model-small-en-us-0.15")  # 모델 다운로드 후 경로
+# 예: LJSpeech → 미국 여성 화자 데이터셋 기반, 발음은 전형적인 American English
+TTS_US_MODEL_NAME = "tts_models/en/ljspeech/tacotron2-DDC"
+# VCTK → 영국 화자들 (multi-speaker)
+TTS_UK_MODEL_NAME = "tts_models/en/vctk/vits"
+
+# 로드에 실패한 모델은 이 시간(초) 동안 다시 시도하지 않고 같은 에러를 바로 냄
+# (예: UK 음성 모델 다운로드 실패 → 요청마다 다운로드를 다시 기다리지 않게)
+MODEL_RETRY_SEC = float(os.getenv("MODEL_RETRY_SEC", "300"))
+
+MB = 1024 * 1024
+
+
+def _rss_bytes() -> int:
+    """현재 프로세스 RSS (리눅스 /proc 기준, 못 읽으면 0)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class _Entry:
+    def __init__(self, name, loader, size_bytes):
+        self.name = name
+        self.loader = loader
+        self.size_bytes = size_bytes   # 예상 크기 (로드 후 실측값으로 갱신)
+        self.model = None
+        self.last_used = 0.0
+        self.lock = threading.Lock()   # 같은 모델을 두번 로드하지 않도록
+        self.error = None              # 마지막 로드 실패 (예외)
+        self.failed_at = 0.0
+
+
+class ModelRegistry:
+    """이름 → loader 등록, get(name) 으로 lazy 로드 + 공유"""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader, size_bytes: int = 0):
+        """loader: 인자 없이 모델을 만들어 리턴하는 함수, size_bytes: 예상 메모리"""
+        with self._lock:
+            if name in self._entries and self._entries[name].model is not None:
+                raise ValueError(f"이미 로드된 모델은 다시 등록할 수 없습니다: {name}")
+            self._entries[name] = _Entry(name, loader, size_bytes)
+
+    def get(self, name: str):
+        try:
+            entry = self._entries[name]
+        except KeyError:
+            raise KeyError(f"등록되지 않은 모델: {name}") from None
+
+        model = entry.model
+        if model is None:
+            with entry.lock:
+                model = entry.model
+                if model is None:
+                    model = self._load(entry)
+        entry.last_used = time.monotonic()
+        return model
+
+    def _load(self, entry: _Entry):
+        if entry.error is not None and time.monotonic() - entry.failed_at < MODEL_RETRY_SEC:
+            raise entry.error
+
+        # 로드 전에 자리 확보
+        self._evict_for(entry.size_bytes, keep=entry.name)
+
+        before = _rss_bytes()
+        try:
+            model = entry.loader()
+        except Exception as e:
+            entry.error, entry.failed_at = e, time.monotonic()
+            print(f"[model_registry] failed to load {entry.name}: {e}")
+            raise
+        entry.error = None
+        # 실측(RSS 증가량)이 예상보다 크면 실측값 사용
+        entry.size_bytes = max(entry.size_bytes, _rss_bytes() - before)
+
+        with self._lock:
+            entry.model = model
+            entry.last_used = time.monotonic()
+        print(f"[model_registry] loaded {entry.name} (~{entry.size_bytes // MB} MB)")
+
+        # 실측이 예상보다 크면 다시 한번 정리
+        self._evict_for(0, keep=entry.name)
+        return model
+
+    def _evict_for(self, incoming_bytes: int, keep: str):
+        """예산을 넘으면 가장 오래 안 쓴 모델부터 내림
+        (이미 모델을 들고 있는 요청은 그대로 끝까지 쓰고, 참조가 없어지면 메모리 해제)"""
+        with self._lock:
+            loaded = [e for e in self._entries.values() if e.model is not None and e.name != keep]
+            used = sum(e.size_bytes for e in loaded)
+            keep_entry = self._entries.get(keep)
+            if keep_entry is not None and keep_entry.model is not None:
+                used += keep_entry.size_bytes
+            for e in sorted(loaded, key=lambda e: e.last_used):
+                if used + incoming_bytes <= self.budget_bytes:
+                    break
+                e.model = None
+                used -= e.size_bytes
+                print(f"[model_registry] evicted {e.name}")
+
+    def unload(self, name: str):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.model = None
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.model is not None
+
+    def loaded(self):
+        """현재 올라와있는 모델 이름들"""
+        return [name for name, e in self._entries.items() if e.model is not None]
+
+
+# ---------------- 기본 모델 loader ----------------
+def _load_vosk():
+    from vosk import Model
+    if not os.path.exists(VOSK_MODEL_PATH):
+        raise FileNotFoundError("Vosk 모델을 먼저 다운로드하세요!")
+    return Model(VOSK_MODEL_PATH)
+
+def _load_tts(model_name: str):
+    def loader():
+        from TTS.api import TTS
+        return TTS(model_name=model_name, progress_bar=False, gpu=False)
+    return loader
+
+
+# 전역 싱글톤처럼 import해서 씀
+registry = ModelRegistry(MODEL_MEMORY_BUDGET_MB * MB)
+registry.register("vosk_en_us", _load_vosk, 100 * MB)
+registry.register("tts_us", _load_tts(TTS_US_MODEL_NAME), 500 * MB)
+registry.register("tts_uk", _load_tts(TTS_UK_MODEL_NAME), 450 * MB)
@@ -0,0 +1,304 @@
+# langgraph_config/profiling.py
+# 노드 / 세부 단계별 시간 + 자원 측정 (네트워크 없이 로컬 파일로 export)
+#
+#   with stage("tts_synth"):           # 현재 요청(request_id)에 기록
+#       ...
+#   @profiled_node("us_tutor")         # 그래프 노드 전체 측정
+#   def us_tutor_node(state): ...
+#
+# - 요청별 기록: profiler.request_records(request_id)
+# - 누적 히스토그램: profiler.export_prometheus(path) / profiler.export_json(path)
+#
+# 측정 범위
+# - cpu_sec: stage 를 연 스레드의 CPU 시간만 (thread_time). 노드가 공용 풀(submit_stage)로 넘긴
+#   작업(tts_synth, 구간별 stt 등)은 노드 CPU 에 안 들어가고 그 작업의 stage 기록에 따로 남음
+# - peak_rss_mb: stage 가 도는 동안 샘플링한 프로세스 RSS 최대값 (ru_maxrss 처럼 프로세스 평생 최대값 X)
+#   rss_delta_mb = 그 최대값 - stage 시작 시 RSS. 동시에 도는 stage 끼리는 같은 프로세스 메모리를 봄
+import contextvars
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+# 이 요청이 어떤 request_id 인지 (노드 → 세부 단계로 전달)
+current_request = contextvars.ContextVar("current_request", default=None)
+
+# wall time 히스토그램 버킷 (초)
+WALL_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 요청별 기록은 최근 N 개 요청만 보관
+PROFILE_KEEP_REQUESTS = int(os.getenv("PROFILE_KEEP_REQUESTS", "200"))
+# 설정하면 요청이 끝날 때마다 이 디렉토리에 metrics.prom / metrics.json 기록
+# (추론 워커는 metrics-worker<N>.prom / .json 으로 따로 - 프로세스마다 자기 기록만 있어서)
+PROFILE_EXPORT_DIR = os.getenv("PROFILE_EXPORT_DIR")
+# stage 가 도는 동안 RSS 를 읽는 간격 (ms) - 이보다 짧게 잡았다 놓는 메모리는 놓칠 수 있음
+PROFILE_RSS_SAMPLE_MS = float(os.getenv("PROFILE_RSS_SAMPLE_MS", "10"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _current_rss_mb() -> float:
+    """지금 RSS (MB) - 리눅스는 /proc/self/statm, 없으면 ru_maxrss 로 대신 (다른 OS)"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            return peak / (1024 * 1024)
+        return peak / 1024
+
+
+class _RssSampler:
+    """
+    실행 중인 stage 들의 RSS 최대값을 백그라운드 스레드 하나로 샘플링
+    (stage 가 없으면 스레드는 대기만 함)
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active = {}                # token -> [시작 RSS, 최대 RSS]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def begin(self):
+        rss = _current_rss_mb()
+        token = object()
+        with self._lock:
+            self._active[token] = [rss, rss]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return token
+
+    def end(self, token):
+        """(시작 RSS, stage 동안 최대 RSS)"""
+        rss = _current_rss_mb()
+        with self._lock:
+            start, peak = self._active.pop(token)
+        return start, max(peak, rss)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._active
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+                continue
+            rss = _current_rss_mb()
+            with self._lock:
+                for window in self._active.values():
+                    if rss > window[1]:
+                        window[1] = rss
+            time.sleep(self.interval)
+
+
+_rss_sampler = _RssSampler(PROFILE_RSS_SAMPLE_MS / 1000.0)
+if hasattr(os, "register_at_fork"):
+    # fork 된 자식에는 샘플링 스레드가 없어서 새로 띄우게
+    os.register_at_fork(after_in_child=lambda: _rss_sampler.__init__(_rss_sampler.interval))
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 마지막은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        out = []
+        for upper, c in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += c
+            out.append((upper, total))
+        return out
+
+
+class Profiler:
+    def __init__(self, keep_requests: int = PROFILE_KEEP_REQUESTS):
+        self.keep_requests = keep_requests
+        self._requests = OrderedDict()   # request_id -> [record, ...]
+        self._wall = {}                  # stage -> _Histogram
+        self._cpu = {}                   # stage -> (sum, count)
+        self._peak_rss = {}              # stage -> stage 실행 중 최대 RSS (MB)
+        self._rss_delta = {}             # stage -> 시작 대비 최대 증가량 (MB)
+        self._lock = threading.Lock()
+        # 여러 프로세스가 같은 PROFILE_EXPORT_DIR 에 쓸 때 구분용 이름 (추론 워커: "worker0" ...)
+        # → export 파일 이름 + prometheus process label 에 들어감 (None 이면 metrics.prom 그대로)
+        self.process = None
+
+    def record(self, request_id, stage_name: str, wall: float, cpu: float, peak_rss_mb: float,
+               rss_delta_mb: float = 0.0):
+        rec = {
+            "stage": stage_name,
+            "wall_sec": round(wall, 6),
+            "cpu_sec": round(cpu, 6),
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "rss_delta_mb": round(rss_delta_mb, 1),
+            "thread": threading.current_thread().name,
+            "ts": time.time(),
+        }
+        with self._lock:
+            if request_id is not None:
+                records = self._requests.get(request_id)
+                if records is None:
+                    records = self._requests[request_id] = []
+                    while len(self._requests) > self.keep_requests:
+                        self._requests.popitem(last=False)
+                records.append(rec)
+
+            hist = self._wall.get(stage_name)
+            if hist is None:
+                hist = self._wall[stage_name] = _Histogram(WALL_BUCKETS)
+            hist.observe(wall)
+            cpu_sum, cpu_count = self._cpu.get(stage_name, (0.0, 0))
+            self._cpu[stage_name] = (cpu_sum + cpu, cpu_count + 1)
+            self._peak_rss[stage_name] = max(self._peak_rss.get(stage_name, 0.0), peak_rss_mb)
+            self._rss_delta[stage_name] = max(self._rss_delta.get(stage_name, 0.0), rss_delta_mb)
+        return rec
+
+    def request_records(self, request_id):
+        with self._lock:
+            return list(self._requests.get(request_id, []))
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._wall.clear()
+            self._cpu.clear()
+            self._peak_rss.clear()
+            self._rss_delta.clear()
+
+    # ---------------- export ----------------
+    def summary(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, hist in self._wall.items():
+                cpu_sum, _ = self._cpu.get(name, (0.0, 0))
+                out[name] = {
+                    "count": hist.count,
+                    "wall_sum_sec": round(hist.sum, 6),
+                    "wall_avg_sec": round(hist.sum / hist.count, 6) if hist.count else 0.0,
+                    "cpu_sum_sec": round(cpu_sum, 6),
+                    "peak_rss_mb": round(self._peak_rss.get(name, 0.0), 1),
+                    "rss_delta_max_mb": round(self._rss_delta.get(name, 0.0), 1),
+                    "wall_buckets": [["+Inf" if u == float("inf") else u, c] for u, c in hist.cumulative()],
+                }
+            return out
+
+    def to_prometheus(self) -> str:
+        extra = f'process="{self.process}",' if self.process else ""
+        lines = [
+            "# HELP speakback_stage_wall_seconds Wall time per pipeline stage.",
+            "# TYPE speakback_stage_wall_seconds histogram",
+        ]
+        summary = self.summary()
+        for name, s in sorted(summary.items()):
+            for upper, c in s["wall_buckets"]:
+                lines.append(f'speakback_stage_wall_seconds_bucket{{{extra}stage="{name}",le="{upper}"}} {c}')
+            lines.append(f'speakback_stage_wall_seconds_sum{{{extra}stage="{name}"}} {s["wall_sum_sec"]}')
+            lines.append(f'speakback_stage_wall_seconds_count{{{extra}stage="{name}"}} {s["count"]}')
+        lines += [
+            "# HELP speakback_stage_cpu_seconds_total CPU time of the thread that ran the stage (excludes work handed to the stage pool).",
+            "# TYPE speakback_stage_cpu_seconds_total counter",
+        ]
+        for name, s in sorted(summary.items()):
+            lines.append(f'speakback_stage_cpu_seconds_total{{{extra}stage="{name}"}} {s["cpu_sum_sec"]}')
+        lines += [
+            "# HELP speakback_stage_peak_rss_megabytes Highest process RSS sampled while the stage ran.",
+            "# TYPE speakback_stage_peak_rss_megabytes gauge",
+        ]
+        for name, s in sorted(summary.items()):
+            lines.append(f'speakback_stage_peak_rss_megabytes{{{extra}stage="{name}"}} {s["peak_rss_mb"]}')
+        lines += [
+            "# HELP speakback_stage_rss_delta_megabytes Largest RSS growth over the stage start.",
+            "# TYPE speakback_stage_rss_delta_megabytes gauge",
+        ]
+        for name, s in sorted(summary.items()):
+            lines.append(f'speakback_stage_rss_delta_megabytes{{{extra}stage="{name}"}} {s["rss_delta_max_mb"]}')
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> dict:
+        with self._lock:
+            requests = {rid: list(recs) for rid, recs in self._requests.items()}
+        return {"process": self.process, "stages": self.summary(), "requests": requests}
+
+    def export_prometheus(self, path: str):
+        _atomic_write(path, self.to_prometheus())
+
+    def export_json(self, path: str):
+        _atomic_write(path, json.dumps(self.to_json(), ensure_ascii=False, indent=2))
+
+    def maybe_export(self):
+        """PROFILE_EXPORT_DIR 가 설정돼 있으면 파일로 덤프 (node_exporter textfile collector 형식)"""
+        if not PROFILE_EXPORT_DIR:
+            return
+        os.makedirs(PROFILE_EXPORT_DIR, exist_ok=True)
+        base = f"metrics-{self.process}" if self.process else "metrics"
+        self.export_prometheus(os.path.join(PROFILE_EXPORT_DIR, base + ".prom"))
+        self.export_json(os.path.join(PROFILE_EXPORT_DIR, base + ".json"))
+
+
+def _atomic_write(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# 전역 싱글톤처럼 import해서 씀
+profiler = Profiler()
+
+
+@contextmanager
+def stage(name: str, request_id=None):
+    """with 블록의 wall / CPU(현재 스레드) / 블록 동안 최대 RSS 를 현재 요청에 기록"""
+    if request_id is None:
+        request_id = current_request.get()
+    rss_token = _rss_sampler.begin()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        rss_start, rss_peak = _rss_sampler.end(rss_token)
+        profiler.record(request_id, name, wall, cpu, rss_peak, rss_peak - rss_start)
+
+
+def profiled_node(name: str):
+    """그래프 노드용 데코레이터: state["request_id"] 를 현재 요청으로 잡고 노드 전체를 측정"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(state, *args, **kwargs):
+            token = current_request.set(state.get("request_id"))
+            try:
+                with stage(name):
+                    return fn(state, *args, **kwargs)
+            finally:
+                current_request.reset(token)
+        return wrapper
+    return decorator
@@ -1,182 +1,432 @@
-from .store import global_store
-import re
-from typing import Optional, Dict
+from typing import Dict, NamedTuple, Optional, Tuple
 
-from vosk import Model, KaldiRecognizer
-import wave, json, os
+from .model_registry import registry, VOSK_MODEL_PATH, TTS_US_MODEL_NAME, TTS_UK_MODEL_NAME
+from .stt_pool import RecognizerPool
+from .cache import LRUByteCache, STTCache, TTSCache, make_key
+from concurrent.futures import Future
+import wave, json, os, threading, weakref
+import importlib.util
+from contextlib import contextmanager
 
-from pydub import AudioSegment
-import io
-import subprocess
+import numpy as np
+
+from .audio_ingest import DecodedAudio, concat_audio
+from .executor import submit_stage
+from .profiling import stage
+from .vad import split_on_silence, VAD_MIN_DURATION
+from .scoring import target_vocabulary
+from functools import lru_cache
 
 # -----------------------------
-# Audio 전처리 (BytesIO → 16kHz mono wav)
+# Vosk 모델 (레지스트리에서 처음 쓸 때 한번만 로드)
 # -----------------------------
-def prepare_audio_for_vosk(org_file_path) -> io.BytesIO:
-    """
-    Streamlit BytesIO / UploadedFile → Vosk에서 쓸 수 있는 16kHz mono wav로 변환
-    """
-    process = subprocess.run(
-        [
-            "ffmpeg",
-            "-i", org_file_path,
-            "-ar", "16000",    # 16kHz
-            "-ac", "1",        # mono
-            "-f", "wav",
-            "pipe:1"
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        check=True
-    )
-    return io.BytesIO(process.stdout)
+def get_vosk_model():
+    return registry.get("vosk_en_us")
+
+# recognizer 는 풀에서 빌려씀 (VOSK_POOL_SIZE 로 동시성 제한)
+vosk_pool = RecognizerPool(get_vosk_model)
+
+# AcceptWaveform 한번에 넘기는 크기 (bytes, int16 → 2000 샘플)
+VOSK_FEED_BYTES = 4000
+
+def _recognize_pcm(pcm: memoryview, offset_sec: float = 0.0, grammar: str = None):
+    """raw PCM 한 구간 인식 → (text, words), 단어 start/end 는 offset_sec 만큼 밀어서 전체 기준으로"""
+    segments = []
+    with vosk_pool.recognizer(grammar=grammar) as rec:
+        # 헤더 없는 raw PCM 이라 그대로 잘라서 넣음 (ffmpeg/임시파일 없이 버퍼에서 바로)
+        for offset in range(0, len(pcm), VOSK_FEED_BYTES):
+            if rec.AcceptWaveform(bytes(pcm[offset:offset + VOSK_FEED_BYTES])):
+                # 쉼(무음)에서 끊긴 구간 결과 → FinalResult 에는 마지막 구간만 남아서 여기서 모아둠
+                segments.append(json.loads(rec.Result()))
+
+        segments.append(json.loads(rec.FinalResult()))
+    text = " ".join(seg.get("text", "") for seg in segments if seg.get("text")).strip()
+    words = [w for seg in segments for w in seg.get("result", [])]  # 단어별 confidence
+    if offset_sec:
+        for w in words:
+            w["start"] = round(w.get("start", 0.0) + offset_sec, 3)
+            w["end"] = round(w.get("end", 0.0) + offset_sec, 3)
+    return text, words
+
+def _recognize_segmented(user_audio: DecodedAudio, grammar: str = None):
+    """긴 녹음: 무음 지점에서 잘라서 구간별로 병렬 인식 후 시간순으로 합침
+    (recognizer 하나가 전체를 붙잡고 있지 않아서 메모리/지연이 구간 길이에 묶임)"""
+    pcm = user_audio.pcm_bytes()
+    sr = user_audio.sample_rate
+    futures = [
+        submit_stage(_recognize_pcm, pcm[start * 2:end * 2], start / sr, grammar)   # int16 → 샘플당 2 bytes
+        for start, end in split_on_silence(user_audio.pcm, sr)
+    ]
+    results = [f.result() for f in futures]
+    text = " ".join(t for t, _ in results if t).strip()
+    words = [w for _, ws in results for w in ws]
+    return text, words
 
 # -----------------------------
-# Vosk 모델 로드
+# STT 캐시 (같은 녹음이면 Vosk 건너뜀)
 # -----------------------------
-VOSK_MODEL_PATH = "vosk-model-small-en-us-0.15"  # 모델 다운로드 후 경로
-if not os.path.exists(VOSK_MODEL_PATH):
-    raise FileNotFoundError("Vosk 모델을 먼저 다운로드하세요!")
-vosk_model = Model(VOSK_MODEL_PATH)
-
-def stt_vosk(user_audio_path: str) :
-    """사용자 음성파일을 Vosk STT로 변환"""
-    audio_stream = prepare_audio_for_vosk(user_audio_path)
-
-    # Vosk recognizer 초기화
-    model = Model(VOSK_MODEL_PATH)
-    rec = KaldiRecognizer(model, 16000)
-    rec.SetWords(True)
-
-    # wav header skip 필요 → wave 모듈 사용 X, raw bytes 그대로 처리
-    while True:
-        data = audio_stream.read(4000)
-        if len(data) == 0:
-            break
-        rec.AcceptWaveform(data)
-
-    result = json.loads(rec.FinalResult())
-    text = result.get("text", "").strip()
-    words = result.get("result", [])  # 단어별 confidence
-
-    conf_dict = {w["word"]: w.get("conf", 0) for w in words}
-    return text, conf_dict
-
-# Try import Coqui TTS (optional)
-try:
-    from TTS.api import TTS
-    TTS_AVAILABLE = True
-except Exception:
-    TTS_AVAILABLE = False
-
-# 앱 시작 시 한 번만 로드
-# 모델 선택: (사용 가능한 모델 이름은 환경에 따라 바꿔야 함)
-# 예: LJSpeech → 미국 여성 화자 데이터셋 기반
-# 발음은 전형적인 American English
-tts_us_model = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False, gpu=False)
-#tts_uk_model = TTS(model_name="tts_models/en/vctk/vits", progress_bar=False, gpu=False)
-
-# 단순 function words 리스트 (빠져도 되는경우가 많은 단어들)
-# 기능어 리스트
-FUNCTION_WORDS = set([
-    "a", "an", "the",
-    "is", "am", "are", "was", "were", "be", "been", "being",
-    "do", "does", "did",
-    "have", "has", "had",
-    "will", "would", "shall", "should", "can", "could", "may", "might", "must",
-    "to", "of", "in", "on", "at", "for", "with", "from", "by",
-    "and", "but", "or", "so", "because",
-    "i", "you", "he", "she", "it", "we", "they", "me", "him", "her", "us", "them"
-])
-
-# 축약(권장) 화이트리스트: 키는 canonical, 값은 허용되는 축약 패턴들(정규표현식)
-CONTRACTION_WHITELIST = {
-    "could have": [r"coulda", r"could've", r"could of"],
-    "would have": [r"woulda", r"would've", r"would of"],
-    "should have": [r"shoulda", r"should've", r"should of"],
-    "going to": [r"gonna", r"gon?na"],
-    "want to": [r"wanna"],
-    "want a": [r"gimme", r"lemme", r"gonna"],  # 예시
-    "let me": [r"lemme"],
-    "give me": [r"gimme"],
-    "I am": [r"I'm", r"Im", r"i'm"],
-    "do not": [r"don't", r"dont"],
-}
-
-def score_content_word(w, user_tokens, conf_dict):
-    """내용어 점수 계산 (가중치↑, confidence 기준↑)"""
-    conf = conf_dict.get(w, 0)
-    if w in user_tokens and conf >= 0.6:
-        return 2.0
-    elif conf >= 0.55:
-        return 1.8
-    elif conf >= 0.4:
-        return 1.6
-    else:
-        return 0.0
-
-def score_function_word(w, user_tokens, conf_dict):
-    """기능어 점수 계산 (보너스, confidence 기준↑)"""
-    conf = conf_dict.get(w, 0)
-    gained = 0.0
-    if w in user_tokens:
-        # 축약 확인
-        for base, patterns in CONTRACTION_WHITELIST.items():
-            if w in base.split():
-                if any(re.fullmatch(pat, ut) for ut in user_tokens for pat in patterns):
-                    if conf >= 0.6:
-                        return 2.5
-        if conf >= 0.6:
-            gained = 1.5
-        elif conf >= 0.5:
-            gained = 1.2
-    elif conf >= 0.4:
-        gained = 0.8
-    return gained
+STT_CACHE_MAX_MB = int(os.getenv("STT_CACHE_MAX_MB", "16"))
+STT_CACHE_DIR = os.getenv("STT_CACHE_DIR")
+stt_cache = STTCache(STT_CACHE_MAX_MB * 1024 * 1024, STT_CACHE_DIR)
+VOSK_MODEL_ID = "vosk:" + os.path.basename(os.path.normpath(VOSK_MODEL_PATH))
+
+# 지금 진행 중인 인식/합성 (key → Future)
+# us/uk 튜터나 미리듣기가 같은 녹음·문장을 동시에 요청하면 한번만 계산하고 결과를 같이 씀
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _single_flight(key: str, fn):
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        result = future.result()
+        if result is not None:
+            return result
+        return _single_flight(key, fn)   # 맡았던 쪽이 결과 없이 끝남 → 다시 시도
+    try:
+        result = fn()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
 
 # -----------------------------
-# 간단한 청킹 함수
+# 목표 문장 단어로 제한한 인식 (grammar 모드)
 # -----------------------------
-def chunk_sentence(text: str):
+# "open": 전체 어휘 / "grammar": 목표 문장 단어 + 허용 축약형 + [unk] 만으로 인식
+VOSK_MODE = os.getenv("VOSK_MODE", "open")
+# grammar 모드 결과에서 [unk] 비율이 이보다 높으면 전체 어휘로 한번 더 인식
+GRAMMAR_MAX_UNK_RATE = float(os.getenv("GRAMMAR_MAX_UNK_RATE", "0.3"))
+UNK = "[unk]"
+
+@lru_cache(maxsize=1024)
+def target_grammar(target_text: str) -> str:
+    """Vosk grammar JSON (같은 문장은 한번만 만들고, 같은 문자열이라 풀에서 recognizer 도 재사용)"""
+    return json.dumps(list(target_vocabulary(target_text)) + [UNK])
+
+def _recognize(user_audio: DecodedAudio, grammar: str = None):
+    if user_audio.duration > VAD_MIN_DURATION:
+        return _recognize_segmented(user_audio, grammar)
+    return _recognize_pcm(user_audio.pcm_bytes(), 0.0, grammar)
+
+def stt_cache_key(user_audio: DecodedAudio, grammar: str = None) -> str:
+    """캐시 키에 인식 모드(grammar 면 grammar 해시)까지 포함"""
+    mode = "open" if grammar is None else "grammar:" + make_key(grammar)
+    return STTCache.key(user_audio.content_hash(), VOSK_MODEL_ID, mode)
+
+@contextmanager
+def claim_stt(user_audio: DecodedAudio, grammar: str = None):
     """
-    영어 문장을 원어민 리듬에 맞춰 대략적인 청크 단위로 분리
+    다른 경로(스트리밍 미리보기)가 이 녹음의 인식을 맡음 → publish(text, words) 로 결과 공유
+    그동안 같은 녹음의 stt_vosk_words 는 Vosk 를 따로 돌리지 않고 이 결과를 기다림
+    (이미 다른 쪽이 인식 중이면 캐시에만 넣음, 중간에 끝나면 기다리던 쪽이 직접 인식)
     """
-    patterns = [r"\b(and|but|or|so|because)\b",
-                r"\b(could have|would have|should have|going to|want to|let me|give me)\b",
-                r"\b(in|on|at|for|with|from|by|to|of)\b"]
-
-    text = text.lower()
-    for p in patterns:
-        text = re.sub(p, r"@@\1@@", text)
-
-    raw_chunks = [c.strip() for c in text.split("@@") if c.strip()]
-    chunks = [re.findall(r"[a-zA-Z']+", c) for c in raw_chunks]
-    return chunks
-
-  
-def check_contraction(user_transcript: str, target_phrase: str) -> bool:
-    """사용자가 허용된 축약형을 썼는지 확인"""
-    if target_phrase in CONTRACTION_WHITELIST:
-        for pattern in CONTRACTION_WHITELIST[target_phrase]:
-            if re.search(pattern, user_transcript, re.IGNORECASE):
-                return True
-    return False
+    key = stt_cache_key(user_audio, grammar)
+    with _inflight_lock:
+        future = None if key in _inflight else _inflight.setdefault(key, Future())
+
+    def publish(text: str, words):
+        stt_cache.put(key, text, words)
+        if future is not None:
+            future.set_result((text, words))
+
+    try:
+        yield publish
+    finally:
+        if future is not None:
+            if not future.done():
+                future.set_result(None)
+            with _inflight_lock:
+                _inflight.pop(key, None)
+
+def _stt_cached(user_audio: DecodedAudio, grammar: str = None):
+    key = stt_cache_key(user_audio, grammar)
+    cached = stt_cache.get(key)
+    if cached is not None:
+        return cached
+
+    def recognize():
+        # 기다리는 사이 미리보기가 먼저 끝냈으면 그 결과 사용
+        cached = stt_cache.get(key)
+        if cached is not None:
+            return cached
+        text, words = _recognize(user_audio, grammar)
+        stt_cache.put(key, text, words)
+        return text, words
+    return _single_flight(key, recognize)
+
+@stage("stt_vosk")
+def stt_vosk_words(user_audio: DecodedAudio, target_text: str = None, mode: str = None):
+    """
+    디코딩된 사용자 음성(16kHz mono int16) → (text, 단어 리스트[word/start/end/conf])
+    mode="grammar" 면 target_text 단어로 제한해서 인식 (기본값은 VOSK_MODE)
+    """
+    mode = mode or VOSK_MODE
+    if mode == "grammar" and target_text and target_vocabulary(target_text):
+        text, words = _stt_cached(user_audio, target_grammar(target_text))
+        unk = sum(1 for w in words if w.get("word") == UNK)
+        # 아무 단어도 없으면(무음 / 아주 짧은 녹음) 전체 어휘로 돌려도 마찬가지라 그대로 끝냄
+        if not words or unk / len(words) <= GRAMMAR_MAX_UNK_RATE:
+            return (
+                " ".join(t for t in text.split() if t != UNK),
+                [w for w in words if w.get("word") != UNK],
+            )
+        # 목표 문장에 없는 말이 많음 → 전체 어휘로 다시 (이것도 캐시)
+    return _stt_cached(user_audio)
+
+def words_to_conf_dict(words):
+    return {w["word"]: w.get("conf", 0) for w in words}
+
+def stt_vosk(user_audio: DecodedAudio) :
+    """디코딩된 사용자 음성(16kHz mono int16)을 Vosk STT로 변환 → (text, 단어별 confidence)"""
+    text, words = stt_vosk_words(user_audio)
+    return text, words_to_conf_dict(words)
+
+# Coqui TTS 설치 여부만 확인 (import 하면 torch 까지 올라와서 실제 로드는 레지스트리에서)
+TTS_AVAILABLE = importlib.util.find_spec("TTS") is not None
+
+# TTS 모델도 레지스트리에서 처음 쓸 때 로드 (builder 등 다른 모듈과 같은 인스턴스 공유)
+# 모델 선택은 model_registry.py 의 TTS_US_MODEL_NAME / TTS_UK_MODEL_NAME
+def get_tts_us_model():
+    return registry.get("tts_us")
+
+def get_tts_uk_model():
+    return registry.get("tts_uk")
+
+# UK tutor 화자 (VCTK 다중화자 모델, p225 = 남부 잉글랜드 여성)
+TTS_UK_SPEAKER = os.getenv("TTS_UK_SPEAKER", "p225")
+# 설정한 화자가 모델에 없으면 순서대로 시도 (전부 잉글랜드 억양 화자)
+UK_FALLBACK_SPEAKERS = ("p225", "p226", "p227", "p228", "p229")
+
+# 튜터별 음성: tutor_type → (레지스트리 이름, 모델 이름, 화자)
+TUTOR_VOICES = {
+    "us": ("tts_us", TTS_US_MODEL_NAME, None),
+    "uk": ("tts_uk", TTS_UK_MODEL_NAME, TTS_UK_SPEAKER),
+}
+
+# 로드된 모델별로 고른 화자 (모델이 언로드되면 같이 사라짐)
+_selected_speakers = weakref.WeakKeyDictionary()
+_selected_speakers_lock = threading.Lock()
+
+# Coqui TTS 인스턴스는 스레드 안전하지 않음 (synthesizer 내부 상태 공유)
+# → 같은 모델로는 한번에 하나만 합성 (us / uk 는 다른 모델이라 서로 안 막음)
+_tts_locks = {name: threading.Lock() for name, _, _ in TUTOR_VOICES.values()}
+
+def _resolve_speaker(model, wanted: str) -> str:
+    """모델에 있는 화자 이름으로 확정 (모델당 한번만 찾음)"""
+    with _selected_speakers_lock:
+        speaker = _selected_speakers.get(model)
+        if speaker is not None:
+            return speaker
+        available = list(getattr(model, "speakers", None) or [])
+        if not available or wanted in available:
+            speaker = wanted
+        else:
+            speaker = next((s for s in UK_FALLBACK_SPEAKERS if s in available), available[0])
+            print(f"[pronunciation] speaker '{wanted}' not in model, using '{speaker}'")
+        _selected_speakers[model] = speaker
+        return speaker
+
+# 채점 규칙(기능어, 축약 화이트리스트, 청킹, 단어 점수)은 scoring.py 로 분리
+# (미리 컴파일된 정규식 + 역인덱스 + 목표 문장 분석 캐시)
+from .scoring import (
+    FUNCTION_WORDS,
+    CONTRACTION_WHITELIST,
+    TOKEN_RE,
+    UserTokens,
+    analyze_target,
+    check_contraction,
+    chunk_sentence,
+    content_points,
+    function_points,
+    score_content_word,
+    score_function_word,
+    tokenize,
+    uses_contraction,
+)
+# 목표 토큰 ↔ 인식 단어 정렬 + 청크별 시간/속도
+from .alignment import (
+    align_words,
+    chunk_bounds,
+    estimate_ref_chunk_durations,
+    pace_scores,
+    user_chunk_durations,
+)
+
+# -----------------------------
+# TTS 캐시 (같은 문장은 다시 합성하지 않음)
+# -----------------------------
+# 메모리 예산(MB), 디스크 캐시 경로(없으면 메모리만 사용)
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "64"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR")
+tts_cache = TTSCache(TTS_CACHE_MAX_MB * 1024 * 1024, TTS_CACHE_DIR)
 
 # -----------------------------
 # TTS 생성 (길이 포함)
 # -----------------------------
-def tts_generate_us(text: str) -> bytes:
-    """US tutor TTS → wav 바이트 리턴"""
-    wav_path = "reference_us.wav"
-    tts_us_model.tts_to_file(text=text, file_path=wav_path)
-    with open(wav_path, "rb") as f:
-        wav_bytes = f.read()
-
-    seg = AudioSegment.from_file(io.BytesIO(wav_bytes), format="wav")
-    duration_sec = len(seg) / 1000.0
-
-    return wav_bytes, duration_sec
-    
+def _to_pcm(samples, sample_rate: int) -> DecodedAudio:
+    """TTS float 파형 → int16 PCM (wav 로 만들지 않고 버퍼 그대로 보관)"""
+    samples = np.asarray(samples, dtype=np.float32)
+    # Coqui save_wav 와 같은 방식으로 정규화
+    peak = max(0.01, float(np.max(np.abs(samples)))) if samples.size else 1.0
+    pcm = (samples * (32767 / peak)).astype(np.int16)
+    return DecodedAudio(pcm=pcm, sample_rate=int(sample_rate))
+
+def _voice_id(tutor_type: str) -> str:
+    """캐시 키용 음성 id (모델 + 화자)"""
+    _, model_name, speaker = TUTOR_VOICES[tutor_type]
+    return f"{model_name}#{speaker}" if speaker else model_name
+
+def _synthesize(text: str, tutor_type: str) -> DecodedAudio:
+    # 요청마다 고정 파일(reference_us.wav)에 쓰면 동시 요청끼리 덮어써서 메모리에서 처리
+    registry_name, _, speaker = TUTOR_VOICES[tutor_type]
+    model = registry.get(registry_name)
+    kwargs = {}
+    if speaker:
+        kwargs["speaker"] = _resolve_speaker(model, speaker)
+    with _tts_locks[registry_name]:
+        samples = model.tts(text=text, **kwargs)
+    return _to_pcm(samples, model.synthesizer.output_sample_rate)
+
+def tts_chunk(text: str, tutor_type: str = "us") -> DecodedAudio:
+    """합성 단위 하나 합성 (단위별로 따로 캐시 → 문장 일부만 바뀌면 바뀐 단위만 다시 합성)"""
+    key = TTSCache.key(text, _voice_id(tutor_type), tutor_type)
+    audio = tts_cache.get(key)
+    if audio is not None:
+        return audio
+
+    def synthesize():
+        audio = _synthesize(text, tutor_type)
+        tts_cache.put(key, audio)
+        return audio
+    return _single_flight(key, synthesize)
+
+class SynthesisUnit(NamedTuple):
+    text: str                            # 한번에 합성할 원문 조각 (숫자/문장부호 그대로, 캐시 키)
+    tokens: str                          # 같은 조각의 채점 토큰 (소문자, 표시/디버그용)
+    chunks: Tuple[Tuple[str, ...], ...]  # 이 조각에 들어간 채점 청크들
+
+def _is_fragment(chunk) -> bool:
+    """혼자 합성하면 단어 하나씩 끊어 읽게 되는 청크 (한 단어 / 기능어만)"""
+    return len(chunk.words) <= 1 or not chunk.content_words
+
+def _unit_spans(target_text: str, units):
+    """
+    합성 단위(토큰 묶음) → 원문 [시작, 끝) 위치
+    단위 사이의 숫자 / 문장부호는 앞 단위에 붙임 (첫 단위는 문장 처음부터, 마지막은 끝까지)
+    토큰이 원문과 안 맞으면 None
+    """
+    matches = list(TOKEN_RE.finditer(target_text))
+    flat = [w for u in units for c in u for w in c]
+    if [m.group().lower() for m in matches] != flat or not all(any(c for c in u) for u in units):
+        return None
+    starts, pos = [], 0
+    for u in units:
+        starts.append(matches[pos].start())
+        pos += sum(len(c) for c in u)
+    starts[0] = 0
+    return list(zip(starts, starts[1:] + [len(target_text)]))
+
+@lru_cache(maxsize=1024)
+def synthesis_units(target_text: str) -> Tuple[SynthesisUnit, ...]:
+    """
+    참조 음성 합성 단위 = 채점 청크를 묶은 것
+    짧은 청크는 다음 청크에 붙임 ("i / want / to / go / to / the store" → 한 번에 합성)
+    합성은 원문 조각 그대로 (숫자, 대소문자, 문장부호/억양 유지) - 원문과 못 맞추면 문장 전체를 한번에
+    """
+    chunks = [chunk.words for chunk in analyze_target(target_text)]
+    units, pending = [], []
+    for chunk in analyze_target(target_text):
+        pending.append(chunk.words)
+        if not _is_fragment(chunk):
+            units.append(pending)
+            pending = []
+    if pending:
+        if units:
+            units[-1].extend(pending)   # 끝에 남은 짧은 청크는 앞 단위에
+        else:
+            units.append(pending)
+
+    spans = _unit_spans(target_text, units) if units else None
+    if spans is None:
+        text = target_text.strip()
+        if not text:
+            return ()
+        tokens = " ".join(w for c in chunks for w in c)
+        return (SynthesisUnit(text, tokens, tuple(chunks)),)
+    return tuple(
+        SynthesisUnit(target_text[lo:hi].strip(), " ".join(w for c in u for w in c), tuple(u))
+        for u, (lo, hi) in zip(units, spans)
+    )
+
+def reference_chunks(target_text: str):
+    """합성 단위 문장들 (순서대로)"""
+    return [unit.text for unit in synthesis_units(target_text)]
+
+def iter_reference_chunks(target_text: str, tutor_type: str = "us"):
+    """합성 단위 순서대로 (index, 문장 조각, DecodedAudio) - 첫 조각이 나오자마자 재생 가능"""
+    for i, text in enumerate(reference_chunks(target_text)):
+        yield i, text, tts_chunk(text, tutor_type)
+
+class ReferenceAudio(NamedTuple):
+    audio: Optional[DecodedAudio]     # 청크들을 이어붙인 전체 음성
+    duration: Optional[float]
+    chunk_durations: Tuple[float, ...]   # 채점 청크별 발화 시간 (앞뒤 무음 제외) → 속도 채점
+
+# 이어붙인 전체 음성 (같은 문장이면 같은 객체 → 브라우저용 인코딩도 한번만)
+TTS_JOINED_CACHE_MB = int(os.getenv("TTS_JOINED_CACHE_MB", "16"))
+_joined_cache = LRUByteCache(TTS_JOINED_CACHE_MB * 1024 * 1024)
+
+@stage("tts_synth")
+def tts_reference(target_text: str, tutor_type: str = "us") -> ReferenceAudio:
+    """튜터 참조 음성 = 합성 단위별 결과를 PCM 그대로 이어붙임"""
+    units = synthesis_units(target_text)
+    if not units:
+        return ReferenceAudio(None, None, ())
+    parts = [tts_chunk(unit.text, tutor_type) for unit in units]
+
+    key = make_key(_voice_id(tutor_type), tutor_type, *(unit.text for unit in units))
+    audio = _joined_cache.get(key)
+    if audio is None:
+        audio = concat_audio(parts)
+        _joined_cache.put(key, audio, audio.pcm.nbytes)
+    # 채점 청크별 시간 = 합성 단위의 실제 발화 시간을 단위 안 청크들에 글자 수 비율로 나눔
+    chunk_durations = tuple(
+        float(d)
+        for unit, part in zip(units, parts)
+        for d in estimate_ref_chunk_durations(unit.chunks, part.speech_duration())
+    )
+    return ReferenceAudio(audio, audio.duration, chunk_durations)
+
+def tts_generate(text: str, tutor_type: str = "us"):
+    """튜터 TTS → (DecodedAudio, 길이(초)) 리턴 (청크별 캐시 우선)"""
+    ref = tts_reference(text, tutor_type)
+    return ref.audio, ref.duration
+
+def tts_generate_us(text: str):
+    return tts_generate(text, "us")
+
+def tts_generate_uk(text: str):
+    return tts_generate(text, "uk")
+
+def prewarm_tts_cache(sentences, tutor_types=("us",)) -> int:
+    """자주 쓰는 문장들을 미리 합성해서 캐시에 넣어둠 (새로 합성한 단위 개수 리턴)"""
+    generated = 0
+    for text in sentences:
+        for tutor_type in tutor_types:
+            for chunk in reference_chunks(text):
+                if tts_cache.get(TTSCache.key(chunk, _voice_id(tutor_type), tutor_type)) is None:
+                    tts_chunk(chunk, tutor_type)
+                    generated += 1
+    return generated
+
 # -----------------------------
 # Audio duration helper
 # -----------------------------
@@ -187,87 +437,133 @@ def get_audio_duration(file_path: str) -> float:
         rate = wf.getframerate()
         return frames / float(rate)   
 
-def evaluate_pronunciation(target_text: str, user_audio_path: str, tutor_type: str = "us"):
+def evaluate_pronunciation(target_text: str, user_audio: DecodedAudio, tutor_type: str = "us"):
     """
-    전체 흐름: 사용자 오디오 → STT → 발음 평가 → 결과 반환
+    전체 흐름: 사용자 오디오(디코딩 완료) → STT → 발음 평가 → 결과 반환
     """
-    # 1) 튜터 참조 음성, 튜터 음성시간
-    ref_audio,ref_duration = tts_generate_us(target_text) if tutor_type == "us" else None
-
-    # 2) 사용자 음성 → STT
-    user_transcript, conf_dict = stt_vosk(user_audio_path)
-    user_tokens = re.findall(r"[a-zA-Z']+", user_transcript.lower())
-    user_seg = AudioSegment.from_file(user_audio_path)
-    # 사용자발화시간
-    user_duration = len(user_seg) / 1000.0
-
-    # 3) 청크화
-    target_chunks = chunk_sentence(target_text)
-    
-
-    feedback = []
-    score = 0
-    total = 0
-
-    # 4) 청크 비교
-    for chunk in target_chunks:
-        total += 2
-        content_words = [w for w in chunk if w not in FUNCTION_WORDS and len(w) > 1]
-        function_words = list(dict.fromkeys([w for w in chunk if w in FUNCTION_WORDS]))  # 중복 제거
-
-        # 내용어 평가
-        for w in content_words:
-            total += 2.0  # 기준점수는 그대로
-            gained = score_content_word(w, user_tokens, conf_dict)
-            score += gained
-            if gained == 2.0:
-                feedback.append(f"내용어 '{w}'는 분명히 잘 들렸어요 👍")
-            elif gained >= 1.5:
-                feedback.append(f"내용어 '{w}'는 대체로 좋았지만 조금 더 또렷하면 완벽해요.")
-            elif gained >= 1.0:
-                feedback.append(f"내용어 '{w}'는 들리긴 했지만 약했어요.")
+    # 1) 튜터 참조 음성(TTS)은 공용 풀에서, 2) 사용자 음성 STT 는 현재 스레드에서 동시에 실행
+    #    서로 결과를 안 쓰니까 전체 시간 = 둘 중 긴 쪽
+    #    STT 는 녹음 기준으로 캐시/공유 → us/uk 튜터가 같이 돌아도 인식은 한번
+    ref_future = submit_stage(tts_reference, target_text, tutor_type) if tutor_type in TUTOR_VOICES else None
+    user_transcript, user_words = stt_vosk_words(user_audio, target_text)
+    # 채점 전에 TTS 결과 합류
+    ref = ref_future.result() if ref_future is not None else ReferenceAudio(None, None, ())
+    ref_audio, ref_duration = ref.audio, ref.duration
+
+    with stage("scoring"):
+        user_tokens = UserTokens(tokenize(user_transcript))
+        # 사용자발화시간 (샘플 수로 계산, 다시 디코딩 X)
+        user_duration = user_audio.duration
+
+        # 3) 청크화 (같은 문장은 분석 결과 캐시)
+        target_analysis = analyze_target(target_text)
+        target_chunks = [list(chunk.words) for chunk in target_analysis]
+
+        # 목표 토큰 위치마다 인식 단어를 정렬 (반복 단어 / 어순까지 반영)
+        target_tokens = [w for chunk in target_analysis for w in chunk.words]
+        alignment = align_words(target_tokens, user_words)
+        bounds = chunk_bounds(target_chunks)
+        matched = alignment.matched
+
+        feedback = []
+        score = 0
+        total = 0
+
+        # 4) 청크 비교
+        for chunk, (lo, hi) in zip(target_analysis, bounds):
+            total += 2
+            best_function = {}   # 기능어 → (매칭 여부, conf) 청크 안에서 가장 좋은 위치
+
+            for k in range(lo, hi):
+                w = target_tokens[k]
+                if w in FUNCTION_WORDS:
+                    cand = (bool(matched[k]), float(alignment.conf[k]))
+                    if w not in best_function or cand > best_function[w]:
+                        best_function[w] = cand
+                    continue
+                if len(w) <= 1:
+                    continue
+
+                # 내용어 평가 (그 위치에 정렬된 단어의 confidence)
+                total += 2.0  # 기준점수는 그대로
+                gained = content_points(bool(matched[k]), float(alignment.conf[k]))
+                score += gained
+                if gained == 2.0:
+                    feedback.append(f"내용어 '{w}'는 분명히 잘 들렸어요 👍")
+                elif gained >= 1.5:
+                    feedback.append(f"내용어 '{w}'는 대체로 좋았지만 조금 더 또렷하면 완벽해요.")
+                elif gained >= 1.0:
+                    feedback.append(f"내용어 '{w}'는 들리긴 했지만 약했어요.")
+                else:
+                    feedback.append(f"내용어 '{w}' 발음을 놓친 것 같아요.")
+
+            # 기능어 평가 (청크 안 중복 제거)
+            for w in chunk.function_words:
+                present, conf = best_function[w]
+                contracted = present and conf >= 0.6 and uses_contraction(w, user_tokens)
+                gained = function_points(present, conf, contracted)
+                score += gained
+                if gained >= 0.8:
+                    feedback.append(f"'{w}'를 축약해서 자연스럽게 말했네요 👌")
+                elif gained >= 0.5:
+                    feedback.append(f"기능어 '{w}'는 무난히 발음했어요.")
+                elif gained > 0:
+                    feedback.append(f"기능어 '{w}'는 조금 약했어요.")
+                else:
+                    feedback.append(f"기능어 '{w}' 발음이 거의 안 들렸어요.")
+
+        # 5) 속도 보너스 (최대 20%) - 청크별로 참조 음성과 시간 비교
+        chunk_timings = []
+        if ref_duration is not None and len(bounds):
+            user_sec = user_chunk_durations(alignment, bounds)
+            if len(ref.chunk_durations) == len(bounds):
+                ref_sec = np.asarray(ref.chunk_durations, dtype=np.float64)   # 청크별로 합성한 실제 길이
             else:
-                feedback.append(f"내용어 '{w}' 발음을 놓친 것 같아요.")
-
-        # 기능어 평가
-        for w in function_words:
-            gained = score_function_word(w, user_tokens, conf_dict)
-            score += gained
-            if gained >= 0.8:
-                feedback.append(f"'{w}'를 축약해서 자연스럽게 말했네요 👌")
-            elif gained >= 0.5:
-                feedback.append(f"기능어 '{w}'는 무난히 발음했어요.")
-            elif gained > 0:
-                feedback.append(f"기능어 '{w}'는 조금 약했어요.")
-            else:
-                feedback.append(f"기능어 '{w}' 발음이 거의 안 들렸어요.")
-    
-    # 5) 속도 보너스 (20%)
-    if user_duration <= ref_duration + 5:
-        bonus = (score / total) * 0.2
-        score += bonus
-        feedback.append("⏱️ 발화 속도가 자연스러워서 추가 점수를 드립니다!")
-
-    print("DEBUG total",total)
-    print("DEBUG score",score)
-    percentage = round((score / total) * 100, 1)
+                ref_sec = estimate_ref_chunk_durations(target_chunks, ref_duration)
+            ratio, pace = pace_scores(user_sec, ref_sec)
+            for chunk, u, r, q, p in zip(target_chunks, user_sec, ref_sec, ratio, pace):
+                chunk_timings.append({
+                    "chunk": " ".join(chunk),
+                    "user_sec": None if np.isnan(u) else round(float(u), 3),
+                    "ref_sec": round(float(r), 3),
+                    "ratio": None if np.isnan(q) else round(float(q), 3),
+                    "pace": None if np.isnan(p) else round(float(p), 3),
+                })
+                if not np.isnan(p) and p < 0.5:
+                    speed = "느렸어요" if q > 1 else "빨랐어요"
+                    feedback.append(f"'{' '.join(chunk)}' 부분은 원어민보다 {speed} ({q:.1f}배).")
+
+            timed = pace[~np.isnan(pace)]
+            if timed.size:
+                pace_score = float(timed.mean())
+                bonus = (score / total) * 0.2 * pace_score
+                score += bonus
+                if pace_score >= 0.8:
+                    feedback.append("⏱️ 발화 속도가 자연스러워서 추가 점수를 드립니다!")
+
+        print("DEBUG total",total)
+        print("DEBUG score",score)
+        percentage = round((score / total) * 100, 1)
 
     # 최종 결과
     result = {
         "score": percentage,
         "feedback": feedback,
         "target_chunks": target_chunks,
-        "reference_tts": ref_audio,   # US tutor 음성 (wav 바이트)
+        "reference_tts": ref_audio,   # 튜터 음성 (DecodedAudio, PCM 그대로)
         "user_transcript": user_transcript,
+        "user_words": user_words,     # 단어별 word/start/end/conf
         "user_duration": user_duration,
-        "ref_duration": ref_duration
+        "ref_duration": ref_duration,
+        "chunk_timings": chunk_timings,   # 청크별 user/ref 시간, 비율, 속도 점수
+        "alignment": {
+            "substitutions": alignment.substitutions,
+            "deletions": alignment.deletions,
+            "insertions": alignment.insertions,
+        },
     }
     return result
 
-    # store into global_store as well (synchronized)
-    global_store.tts_us_comment = final_comment
-    global_store.tts_us_audio = tts_bytes
-
 """
     out = {
         "comment": final_comment,
@@ -0,0 +1,277 @@
+# langgraph_config/results_store.py
+# 채점 결과 저장소 (기본: 로컬 SQLite)
+# - 요청 경로에서는 큐에 넣기만 함 → 실제 쓰기는 백그라운드 스레드가 모아서 한 트랜잭션으로
+# - 사용자 / 시도(attempt) / 단어별 confidence / 점수 / 음성 참조(해시, 선택적으로 wav 파일)
+# - 대시보드용 조회: "사용자 X 가 문장 Y 를 연습한 최근 N 번"
+import atexit
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import wave
+
+RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", "speakback.db")
+# 설정하면 사용자 음성(16kHz mono wav)도 <audio_ref>.wav 로 저장
+RESULTS_AUDIO_DIR = os.getenv("RESULTS_AUDIO_DIR")
+RESULTS_BATCH_SIZE = int(os.getenv("RESULTS_BATCH_SIZE", "64"))
+RESULTS_FLUSH_SEC = float(os.getenv("RESULTS_FLUSH_SEC", "0.5"))
+RESULTS_QUEUE_SIZE = int(os.getenv("RESULTS_QUEUE_SIZE", "10000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL UNIQUE,
+    created_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id             INTEGER PRIMARY KEY,
+    request_id     TEXT UNIQUE,
+    user_id        INTEGER NOT NULL REFERENCES users(id),
+    target_text    TEXT NOT NULL,
+    target_hash    TEXT NOT NULL,
+    tutor_type     TEXT NOT NULL,
+    score          REAL,
+    transcript     TEXT,
+    feedback       TEXT,            -- JSON 배열
+    user_duration  REAL,
+    ref_duration   REAL,
+    audio_ref      TEXT,            -- 디코딩된 PCM sha256
+    created_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_user_target
+    ON attempts (user_id, target_hash, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_attempts_user_time
+    ON attempts (user_id, created_at DESC);
+CREATE TABLE IF NOT EXISTS word_confidences (
+    attempt_id  INTEGER NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
+    position    INTEGER NOT NULL,
+    word        TEXT NOT NULL,
+    conf        REAL,
+    start_sec   REAL,
+    end_sec     REAL,
+    PRIMARY KEY (attempt_id, position)
+);
+"""
+
+
+def target_hash(target_text: str) -> str:
+    """같은 문장이면 공백/대소문자 차이와 무관하게 같은 값"""
+    normalized = " ".join(target_text.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")    # 쓰는 동안에도 읽기 가능
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class ResultsStore:
+    def __init__(self, path: str = RESULTS_DB_PATH, audio_dir: str = RESULTS_AUDIO_DIR,
+                 batch_size: int = RESULTS_BATCH_SIZE, flush_sec: float = RESULTS_FLUSH_SEC):
+        self.path = path
+        self.audio_dir = audio_dir
+        self.batch_size = batch_size
+        self.flush_sec = flush_sec
+        self.dropped = 0
+
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        if audio_dir:
+            os.makedirs(audio_dir, exist_ok=True)
+
+        self._queue = queue.Queue(maxsize=RESULTS_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._writer, name="results-writer", daemon=True)
+        self._thread.start()
+
+    # ---------------- 쓰기 (요청 경로: 큐에 넣기만) ----------------
+    def save_attempt(self, user_name: str, target_text: str, score, transcript: str,
+                     feedback=None, words=None, user_duration=None, ref_duration=None,
+                     tutor_type: str = "us", request_id: str = None, user_audio=None) -> bool:
+        """큐에 넣고 바로 리턴 (큐가 꽉 차면 버리고 False)"""
+        record = {
+            "user_name": user_name,
+            "target_text": target_text,
+            "score": score,
+            "transcript": transcript,
+            "feedback": feedback or [],
+            "words": words or [],
+            "user_duration": user_duration,
+            "ref_duration": ref_duration,
+            "tutor_type": tutor_type,
+            "request_id": request_id,
+            "user_audio": user_audio,      # 해시 / 파일 저장은 writer 스레드에서
+            "created_at": time.time(),
+        }
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"[results_store] queue full, dropped attempt ({self.dropped} total)")
+            return False
+
+    def flush(self, timeout: float = None):
+        """지금까지 넣은 기록이 DB 에 다 쓰일 때까지 대기"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    # ---------------- writer 스레드 ----------------
+    def _writer(self):
+        conn = _connect(self.path)
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_sec
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break   # flush 요청 → 지금까지 모은 것 바로 씀
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(conn, batch)
+            for w in waiters:
+                w.set()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch):
+        """배치 전체를 한 트랜잭션으로, 실패하면 한 건씩 다시 (문제 있는 기록만 버림)"""
+        try:
+            with conn:
+                for rec in batch:
+                    self._write_record(conn, rec)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self._drop(batch[0], e)
+                return
+            print(f"[results_store] batch write failed ({len(batch)} attempts), retrying one by one: {e}")
+
+        for rec in batch:
+            try:
+                with conn:
+                    self._write_record(conn, rec)
+            except Exception as e:
+                self._drop(rec, e)
+
+    def _drop(self, rec, error):
+        self.dropped += 1
+        print(f"[results_store] dropped attempt request_id={rec.get('request_id')} "
+              f"({self.dropped} total): {type(error).__name__}: {error}")
+
+    def _write_record(self, conn: sqlite3.Connection, rec):
+        audio_ref = None
+        user_audio = rec["user_audio"]
+        if user_audio is not None:
+            audio_ref = user_audio.content_hash()
+            if self.audio_dir:
+                self._save_audio(audio_ref, user_audio)
+
+        conn.execute(
+            "INSERT OR IGNORE INTO users (name, created_at) VALUES (?, ?)",
+            (rec["user_name"], rec["created_at"]),
+        )
+        user_id = conn.execute(
+            "SELECT id FROM users WHERE name = ?", (rec["user_name"],)
+        ).fetchone()[0]
+        cur = conn.execute(
+            """INSERT OR REPLACE INTO attempts
+               (request_id, user_id, target_text, target_hash, tutor_type, score, transcript,
+                feedback, user_duration, ref_duration, audio_ref, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                rec["request_id"], user_id, rec["target_text"], target_hash(rec["target_text"]),
+                rec["tutor_type"], rec["score"], rec["transcript"],
+                json.dumps(rec["feedback"], ensure_ascii=False),
+                rec["user_duration"], rec["ref_duration"], audio_ref, rec["created_at"],
+            ),
+        )
+        attempt_id = cur.lastrowid
+        conn.executemany(
+            """INSERT INTO word_confidences (attempt_id, position, word, conf, start_sec, end_sec)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                (attempt_id, i, w["word"], w.get("conf"), w.get("start"), w.get("end"))
+                for i, w in enumerate(rec["words"])
+            ],
+        )
+
+    def _save_audio(self, audio_ref: str, user_audio):
+        path = os.path.join(self.audio_dir, audio_ref + ".wav")
+        if os.path.exists(path):
+            return   # 같은 녹음은 한번만
+        tmp = path + ".tmp"
+        with wave.open(tmp, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(user_audio.sample_rate)
+            wf.writeframes(user_audio.pcm_bytes())
+        os.replace(tmp, path)
+
+    # ---------------- 조회 ----------------
+    def recent_attempts(self, user_name: str, target_text: str = None, limit: int = 10):
+        """사용자의 최근 시도 N 개 (target_text 를 주면 그 문장만) - 최신순"""
+        conn = _connect(self.path)
+        try:
+            sql = """SELECT a.id, a.request_id, a.target_text, a.tutor_type, a.score, a.transcript,
+                            a.feedback, a.user_duration, a.ref_duration, a.audio_ref, a.created_at
+                     FROM attempts a JOIN users u ON u.id = a.user_id
+                     WHERE u.name = ?"""
+            params = [user_name]
+            if target_text is not None:
+                sql += " AND a.target_hash = ?"
+                params.append(target_hash(target_text))
+            sql += " ORDER BY a.created_at DESC LIMIT ?"
+            params.append(limit)
+            rows = []
+            for row in conn.execute(sql, params):
+                rec = dict(row)
+                rec["feedback"] = json.loads(rec["feedback"] or "[]")
+                rows.append(rec)
+            return rows
+        finally:
+            conn.close()
+
+    def attempt_words(self, attempt_id: int):
+        """시도 하나의 단어별 confidence / 시간"""
+        conn = _connect(self.path)
+        try:
+            return [
+                dict(row) for row in conn.execute(
+                    """SELECT position, word, conf, start_sec, end_sec FROM word_confidences
+                       WHERE attempt_id = ? ORDER BY position""",
+                    (attempt_id,),
+                )
+            ]
+        finally:
+            conn.close()
+
+
+# 프로세스 공용 저장소 (처음 호출 시 생성, 종료 시 남은 기록 flush)
+_results_store = None
+_results_store_lock = threading.Lock()
+
+def get_results_store() -> ResultsStore:
+    global _results_store
+    if _results_store is None:
+        with _results_store_lock:
+            if _results_store is None:
+                _results_store = ResultsStore()
+                atexit.register(_results_store.flush, 5.0)
+    return _results_store
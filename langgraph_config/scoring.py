@@ -0,0 +1,220 @@
+# langgraph_config/scoring.py
+# 채점 엔진: 정규식 미리 컴파일 + 토큰 set / 역인덱스 + 목표 문장 분석 캐시
+# (긴 지문 / 배치 채점에서 transcript 길이에 거의 선형으로 돌도록)
+import re
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+# 단순 function words 리스트 (빠져도 되는경우가 많은 단어들)
+# 기능어 리스트
+FUNCTION_WORDS = frozenset([
+    "a", "an", "the",
+    "is", "am", "are", "was", "were", "be", "been", "being",
+    "do", "does", "did",
+    "have", "has", "had",
+    "will", "would", "shall", "should", "can", "could", "may", "might", "must",
+    "to", "of", "in", "on", "at", "for", "with", "from", "by",
+    "and", "but", "or", "so", "because",
+    "i", "you", "he", "she", "it", "we", "they", "me", "him", "her", "us", "them"
+])
+
+# 축약(권장) 화이트리스트: 키는 canonical, 값은 허용되는 축약 패턴들(정규표현식)
+CONTRACTION_WHITELIST = {
+    "could have": [r"coulda", r"could've", r"could of"],
+    "would have": [r"woulda", r"would've", r"would of"],
+    "should have": [r"shoulda", r"should've", r"should of"],
+    "going to": [r"gonna", r"gon?na"],
+    "want to": [r"wanna"],
+    "want a": [r"gimme", r"lemme", r"gonna"],  # 예시
+    "let me": [r"lemme"],
+    "give me": [r"gimme"],
+    "I am": [r"I'm", r"Im", r"i'm"],
+    "do not": [r"don't", r"dont"],
+}
+
+TOKEN_RE = re.compile(r"[a-zA-Z']+")
+
+# 축약 base 마다 패턴들을 하나의 정규식으로 묶어서 미리 컴파일
+_CONTRACTION_RE = {
+    base: re.compile("|".join(f"(?:{p})" for p in patterns))
+    for base, patterns in CONTRACTION_WHITELIST.items()
+}
+_CONTRACTION_SEARCH_RE = {
+    base: re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+    for base, patterns in CONTRACTION_WHITELIST.items()
+}
+
+def _build_contraction_index():
+    """역인덱스: 단어 → 그 단어를 포함하는 축약 base 들"""
+    index = {}
+    for base in CONTRACTION_WHITELIST:
+        for word in base.split():
+            index.setdefault(word, []).append(base)
+    return {w: tuple(bases) for w, bases in index.items()}
+
+CONTRACTION_INDEX = _build_contraction_index()
+
+# 청킹용 정규식 (호출마다 다시 컴파일하지 않도록)
+_CHUNK_PATTERNS = [
+    re.compile(r"\b(and|but|or|so|because)\b"),
+    re.compile(r"\b(could have|would have|should have|going to|want to|let me|give me)\b"),
+    re.compile(r"\b(in|on|at|for|with|from|by|to|of)\b"),
+]
+
+
+def tokenize(text: str):
+    return TOKEN_RE.findall(text.lower())
+
+
+# -----------------------------
+# 사용자 토큰 인덱스
+# -----------------------------
+class UserTokens:
+    """
+    사용자 transcript 토큰을 한번만 정리해둠
+    - 포함 여부: set (O(1))
+    - 축약 사용 여부: base 별로 처음 물어볼 때 한번만 계산 (고유 토큰 수에 비례)
+    """
+
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.token_set = frozenset(self.tokens)
+        self._contraction_hits = {}
+
+    def __contains__(self, word):
+        return word in self.token_set
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def uses_contraction(self, base: str) -> bool:
+        hit = self._contraction_hits.get(base)
+        if hit is None:
+            pattern = _CONTRACTION_RE[base]
+            hit = any(pattern.fullmatch(t) for t in self.token_set)
+            self._contraction_hits[base] = hit
+        return hit
+
+def as_user_tokens(user_tokens) -> UserTokens:
+    return user_tokens if isinstance(user_tokens, UserTokens) else UserTokens(user_tokens)
+
+
+# -----------------------------
+# 단어 점수
+# -----------------------------
+def content_points(present: bool, conf: float) -> float:
+    """내용어 점수 (가중치↑, confidence 기준↑) - present: 사용자 발화에 그 단어가 있는지"""
+    if present and conf >= 0.6:
+        return 2.0
+    elif conf >= 0.55:
+        return 1.8
+    elif conf >= 0.4:
+        return 1.6
+    else:
+        return 0.0
+
+def function_points(present: bool, conf: float, contracted: bool = False) -> float:
+    """기능어 점수 (보너스, confidence 기준↑) - contracted: 허용된 축약형으로 말했는지"""
+    gained = 0.0
+    if present:
+        if conf >= 0.6 and contracted:
+            return 2.5
+        if conf >= 0.6:
+            gained = 1.5
+        elif conf >= 0.5:
+            gained = 1.2
+    elif conf >= 0.4:
+        gained = 0.8
+    return gained
+
+def uses_contraction(w, user_tokens) -> bool:
+    """w 가 들어간 축약 base 중 하나라도 사용자가 축약형으로 말했는지 (역인덱스로 해당 base 만 확인)"""
+    bases = CONTRACTION_INDEX.get(w)
+    if not bases:
+        return False
+    tokens = as_user_tokens(user_tokens)
+    return any(tokens.uses_contraction(base) for base in bases)
+
+def score_content_word(w, user_tokens, conf_dict):
+    """내용어 점수 계산 (단어 기준 conf_dict)"""
+    return content_points(w in user_tokens, conf_dict.get(w, 0))
+
+def score_function_word(w, user_tokens, conf_dict):
+    """기능어 점수 계산 (단어 기준 conf_dict)"""
+    conf = conf_dict.get(w, 0)
+    present = w in user_tokens
+    contracted = present and conf >= 0.6 and uses_contraction(w, user_tokens)
+    return function_points(present, conf, contracted)
+
+
+# -----------------------------
+# 목표 문장 분석 (청크 + 내용어/기능어 분류, 문장별 캐시)
+# -----------------------------
+class ChunkAnalysis(NamedTuple):
+    words: Tuple[str, ...]
+    content_words: Tuple[str, ...]
+    function_words: Tuple[str, ...]   # 중복 제거
+
+def chunk_sentence(text: str):
+    """
+    영어 문장을 원어민 리듬에 맞춰 대략적인 청크 단위로 분리
+    """
+    text = text.lower()
+    for p in _CHUNK_PATTERNS:
+        text = p.sub(r"@@\1@@", text)
+
+    raw_chunks = [c.strip() for c in text.split("@@") if c.strip()]
+    chunks = [TOKEN_RE.findall(c) for c in raw_chunks]
+    return chunks
+
+@lru_cache(maxsize=1024)
+def analyze_target(target_text: str) -> Tuple[ChunkAnalysis, ...]:
+    """같은 목표 문장은 한번만 분석 (결과는 immutable 이라 공유해도 안전)"""
+    analysis = []
+    for chunk in chunk_sentence(target_text):
+        content_words = tuple(w for w in chunk if w not in FUNCTION_WORDS and len(w) > 1)
+        function_words = tuple(dict.fromkeys(w for w in chunk if w in FUNCTION_WORDS))
+        analysis.append(ChunkAnalysis(tuple(chunk), content_words, function_words))
+    return tuple(analysis)
+
+
+def _literal_variants(pattern: str):
+    """축약 패턴(정규식) → 실제 단어들 ("gon?na" → gonna, gona), 그 외 정규식 문법은 건너뜀"""
+    variants = [""]
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if not (ch.isalpha() or ch in "' "):
+            return []
+        if i + 1 < len(pattern) and pattern[i + 1] == "?":
+            variants = [v + ch for v in variants] + variants
+            i += 2
+        else:
+            variants = [v + ch for v in variants]
+            i += 1
+    return [v.lower() for v in variants]
+
+@lru_cache(maxsize=1024)
+def target_vocabulary(target_text: str) -> Tuple[str, ...]:
+    """
+    목표 문장으로 인식할 단어 목록 (Vosk grammar 용, 문장별 캐시)
+    = 목표 토큰 + 목표에 들어간 축약 base 의 허용 축약형 단어들
+    """
+    tokens = tokenize(target_text)
+    words = dict.fromkeys(tokens)
+    text = " ".join(tokens)
+    for base, patterns in CONTRACTION_WHITELIST.items():
+        if re.search(rf"\b{re.escape(base.lower())}\b", text):
+            for pattern in patterns:
+                for variant in _literal_variants(pattern):
+                    words.update(dict.fromkeys(variant.split()))
+    return tuple(words)
+
+
+def check_contraction(user_transcript: str, target_phrase: str) -> bool:
+    """사용자가 허용된 축약형을 썼는지 확인"""
+    pattern = _CONTRACTION_SEARCH_RE.get(target_phrase)
+    return bool(pattern and pattern.search(user_transcript))
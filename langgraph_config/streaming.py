@@ -0,0 +1,169 @@
+# langgraph_config/streaming.py
+# 스트리밍 인식: 음성 프레임이 들어오는 대로 Vosk 에 넣고 partial 결과 + 청크 단위 점수를 바로 돌려줌
+import json
+import threading
+from contextlib import ExitStack
+
+from .audio_ingest import DecodedAudio
+from .pronunciation_module import UNK, VOSK_MODE, claim_stt, target_grammar, vosk_pool
+from .scoring import UserTokens, analyze_target, score_content_word, score_function_word, tokenize
+
+# 한번에 넣는 프레임 길이 (0.25초, 16kHz int16)
+STREAM_FRAME_BYTES = 8000
+
+
+class StreamingSession:
+    """
+    session = StreamingSession(target_text)
+    for frame in frames:
+        update = session.feed(frame)   # partial + 청크별 진행상황
+    final = session.finish()           # 최종 transcript + 단어별 confidence
+    """
+
+    def __init__(self, target_text: str):
+        self.target_analysis = analyze_target(target_text)
+        self._words = []          # 확정된 단어들 (Vosk result: word/start/end/conf)
+        self.raw_words = []       # [unk] 포함 원래 결과 (STT 캐시에 그대로 넣을 때)
+        self._partial = ""
+        self._stack = ExitStack()
+        # 세션이 끝날 때까지 recognizer 하나를 빌려서 씀 (grammar 모드면 목표 문장 단어로 제한)
+        self.grammar = target_grammar(target_text) if VOSK_MODE == "grammar" else None
+        self._rec = self._stack.enter_context(vosk_pool.recognizer(grammar=self.grammar))
+        self._closed = False
+
+    def _add_words(self, result: dict):
+        self.raw_words.extend(result.get("result", []))
+        # grammar 모드의 [unk] (목표 문장 밖 단어) 는 빼고 확정
+        self._words.extend(w for w in result.get("result", []) if w.get("word") != UNK)
+
+    # ---------------- 입력 ----------------
+    def feed(self, pcm: bytes) -> dict:
+        """16kHz mono int16 raw PCM 조각 입력 → 현재까지의 update 리턴"""
+        if self._closed:
+            raise RuntimeError("이미 끝난 세션입니다")
+        if self._rec.AcceptWaveform(bytes(pcm)):
+            # 무음에서 구간이 끝남 → 확정 단어로 이동
+            self._add_words(json.loads(self._rec.Result()))
+            self._partial = ""
+        else:
+            partial = json.loads(self._rec.PartialResult()).get("partial", "")
+            self._partial = " ".join(t for t in partial.split() if t != UNK)
+        return self._update(final=False)
+
+    def finish(self) -> dict:
+        """남은 음성 확정 + recognizer 반납"""
+        if not self._closed:
+            try:
+                self._add_words(json.loads(self._rec.FinalResult()))
+                self._partial = ""
+            finally:
+                self.close()
+        return self._update(final=True)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._stack.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------- 출력 ----------------
+    @property
+    def final_text(self) -> str:
+        return " ".join(w["word"] for w in self._words)
+
+    def _update(self, final: bool) -> dict:
+        confirmed_tokens = [w["word"] for w in self._words]
+        partial_tokens = tokenize(self._partial)
+        conf_dict = {w["word"]: w.get("conf", 0) for w in self._words}
+
+        return {
+            "final": final,
+            "text": self.final_text,
+            "partial": self._partial,
+            "chunks": self._score_chunks(confirmed_tokens, partial_tokens, conf_dict),
+            "words": list(self._words) if final else None,
+        }
+
+    def _score_chunks(self, confirmed_tokens, partial_tokens, conf_dict):
+        """청크마다 지금까지 들린 단어 수 / 점수 (partial 단어는 confidence 가 없어서 '들림' 표시만)"""
+        confirmed = UserTokens(confirmed_tokens)
+        heard = confirmed.token_set | set(partial_tokens)
+        chunks = []
+        for chunk in self.target_analysis:
+            score = 0.0
+            total = 2.0 + 2.0 * len(chunk.content_words)
+            for w in chunk.content_words:
+                score += score_content_word(w, confirmed, conf_dict)
+            for w in chunk.function_words:
+                score += score_function_word(w, confirmed, conf_dict)
+
+            chunks.append({
+                "chunk": " ".join(chunk.words),
+                "heard": sum(1 for w in chunk.words if w in heard),
+                "size": len(chunk.words),
+                "score": round(min(score / total, 1.0) * 100, 1) if total else 0.0,
+            })
+        return chunks
+
+
+def iter_stream_updates(target_text: str, user_audio: DecodedAudio, frame_bytes: int = STREAM_FRAME_BYTES):
+    """
+    이미 받은 음성을 프레임 단위로 흘려보내면서 update 를 하나씩 yield (마지막은 final)
+    인식 결과는 STT 캐시 / 진행 중 인식으로 공유해서 같은 녹음을 채점하는 job 이 Vosk 를 다시 안 돌림
+    """
+    pcm = user_audio.pcm_bytes()
+    with StreamingSession(target_text) as session, claim_stt(user_audio, session.grammar) as publish:
+        for offset in range(0, len(pcm), frame_bytes):
+            yield session.feed(pcm[offset:offset + frame_bytes])
+        final = session.finish()
+        publish(" ".join(w["word"] for w in session.raw_words), session.raw_words)
+        yield final
+
+
+class BackgroundStream:
+    """
+    iterator 를 백그라운드 스레드에서 끝까지 돌리고 나온 값을 모아둠 (UI 스레드는 polling 만)
+        preview = BackgroundStream(iter_stream_updates, target_text, user_audio)
+        preview.items / preview.latest / preview.done / preview.error
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        self._items = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(fn, args, kwargs),
+                                        name="preview", daemon=True)
+        self._thread.start()
+
+    def _run(self, fn, args, kwargs):
+        try:
+            for item in fn(*args, **kwargs):
+                with self._lock:
+                    self._items.append(item)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self._done.set()
+
+    @property
+    def items(self) -> list:
+        with self._lock:
+            return list(self._items)
+
+    @property
+    def latest(self):
+        with self._lock:
+            return self._items[-1] if self._items else None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
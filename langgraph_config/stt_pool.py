@@ -0,0 +1,102 @@
+# langgraph_config/stt_pool.py
+# Vosk recognizer 풀 (모델은 한번만 로드, recognizer 는 빌려쓰고 반납)
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+SAMPLE_RATE = 16000
+
+# 동시에 돌 수 있는 STT 개수 상한 (환경변수로 조절)
+VOSK_POOL_SIZE = int(os.getenv("VOSK_POOL_SIZE", "4"))
+
+
+class RecognizerPool:
+    """
+    고정 크기 KaldiRecognizer 풀
+    - 모델은 get_model() 이 돌려주는 공용 모델 하나만 공유 (모델 레지스트리)
+    - recognizer 는 필요할 때 size 개까지만 만들고, 그 이상은 반납될 때까지 대기
+    - 레지스트리에서 모델이 내려갔다 다시 올라오면 예전 모델의 recognizer 는 버림
+    - grammar 별로 따로 재사용, 자리가 없으면 놀고 있는 가장 오래된 recognizer 와 교체
+    """
+
+    def __init__(self, get_model, size: int = VOSK_POOL_SIZE, sample_rate: int = SAMPLE_RATE):
+        if size < 1:
+            raise ValueError("pool size 는 1 이상이어야 합니다")
+        self.get_model = get_model
+        self.size = size
+        self.sample_rate = sample_rate
+        self._idle = []          # 반납된 (recognizer, model, grammar) (LIFO)
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def _new_recognizer(self, model, grammar=None):
+        from vosk import KaldiRecognizer   # 처음 인식할 때 import (앱 시작을 막지 않게)
+        if grammar:
+            rec = KaldiRecognizer(model, self.sample_rate, grammar)
+        else:
+            rec = KaldiRecognizer(model, self.sample_rate)
+        rec.SetWords(True)
+        return rec
+
+    def _acquire(self, timeout, grammar=None):
+        model = self.get_model()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                # 최근에 반납된 것부터 같은 grammar 로 만든 recognizer 를 찾음
+                for i in range(len(self._idle) - 1, -1, -1):
+                    rec, rec_model, rec_grammar = self._idle[i]
+                    if rec_model is not model:
+                        # 예전 모델로 만든 recognizer → 버리고 새로 만들 자리로 씀
+                        del self._idle[i]
+                        self._created -= 1
+                    elif rec_grammar == grammar:
+                        del self._idle[i]
+                        return rec, model, grammar
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                if self._idle:
+                    # 다른 grammar 로 만든 recognizer 만 놀고 있음 → 가장 오래된 것을 버리고 그 자리에 새로
+                    self._idle.pop(0)
+                    break
+                # 풀이 꽉 찼으면 반납될 때까지 기다림 (동시성 제한)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("사용 가능한 Vosk recognizer 가 없습니다")
+                self._cond.wait(remaining)
+
+        # recognizer 생성은 lock 밖에서
+        try:
+            return self._new_recognizer(model, grammar), model, grammar
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, rec, model, grammar):
+        try:
+            rec.Reset()
+        except Exception:
+            # Reset 이 안되는 recognizer 는 버리고 자리만 비워둠
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((rec, model, grammar))
+            self._cond.notify()
+
+    @contextmanager
+    def recognizer(self, timeout: float = None, grammar: str = None):
+        """
+        with pool.recognizer() as rec: ... (반납 시 Reset)
+        grammar: Vosk grammar JSON (단어 목록) - 주면 그 단어들로만 인식하는 recognizer (grammar 별로 재사용)
+        """
+        rec, model, grammar = self._acquire(timeout, grammar)
+        try:
+            yield rec
+        finally:
+            self._release(rec, model, grammar)
@@ -0,0 +1,82 @@
+# langgraph_config/vad.py
+# 에너지 기반 음성 구간 검출 (VAD) - 긴 녹음을 무음 지점에서 잘라서 구간별로 인식하기 위함
+import os
+
+import numpy as np
+
+FRAME_MS = 30
+# 이 길이(초)보다 긴 녹음만 나눠서 처리
+VAD_MIN_DURATION = float(os.getenv("VAD_MIN_DURATION", "20"))
+# 구간 최대 길이(초) - 무음이 없어도 이 길이를 넘으면 가장 조용한 지점에서 자름
+VAD_MAX_SEGMENT = float(os.getenv("VAD_MAX_SEGMENT", "15"))
+# 이 길이(초) 이상 조용하면 무음으로 봄
+VAD_MIN_SILENCE = 0.3
+# 너무 짧은 구간은 앞 구간에 붙임
+VAD_MIN_SEGMENT = 1.0
+# 잡음 바닥보다 이만큼(dB) 커야 음성
+VAD_MARGIN_DB = 12.0
+
+
+def frame_energy_db(pcm: np.ndarray, frame_len: int) -> np.ndarray:
+    """프레임별 RMS (dBFS)"""
+    n_frames = len(pcm) // frame_len
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = pcm[:n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    return 20.0 * np.log10(rms)
+
+
+def split_on_silence(pcm: np.ndarray, sample_rate: int = 16000,
+                     max_segment: float = VAD_MAX_SEGMENT,
+                     min_silence: float = VAD_MIN_SILENCE,
+                     min_segment: float = VAD_MIN_SEGMENT):
+    """
+    int16 PCM → [(start_sample, end_sample), ...] (빈틈 없이 전체를 덮음)
+    무음 구간 가운데에서 자르고, 무음이 없으면 최대 길이 안에서 가장 조용한 프레임에서 자름
+    """
+    frame_len = int(sample_rate * FRAME_MS / 1000)
+    energy = frame_energy_db(pcm, frame_len)
+    total = len(pcm)
+    if len(energy) == 0:
+        return [(0, total)]
+
+    # 잡음 바닥 = 하위 10% 에너지, 그보다 VAD_MARGIN_DB 이상 크면 음성
+    noise_floor = float(np.percentile(energy, 10))
+    speech = energy > noise_floor + VAD_MARGIN_DB
+
+    # 무음 run 찾기 (연속된 False 구간)
+    padded = np.concatenate(([True], speech, [True])).astype(np.int8)
+    diff = np.diff(padded)
+    silence_starts = np.flatnonzero(diff == -1)
+    silence_ends = np.flatnonzero(diff == 1)
+    min_silence_frames = max(1, int(min_silence * 1000 / FRAME_MS))
+    cut_frames = [
+        (s + e) // 2
+        for s, e in zip(silence_starts, silence_ends)
+        if e - s >= min_silence_frames and s > 0 and e < len(speech)
+    ]
+
+    max_frames = max(1, int(max_segment * 1000 / FRAME_MS))
+    min_frames = max(1, int(min_segment * 1000 / FRAME_MS))
+
+    boundaries = [0]
+    for cut in cut_frames + [len(energy)]:
+        # 무음 없이 너무 길어지면 그 사이 가장 조용한 프레임에서 강제로 자름
+        while cut - boundaries[-1] > max_frames:
+            lo = boundaries[-1] + min_frames
+            hi = boundaries[-1] + max_frames
+            window = energy[lo:hi][::-1]
+            # 같은 값이면 뒤쪽 프레임 → 구간을 최대한 길게
+            boundaries.append(hi - 1 - int(np.argmin(window)))
+        if cut - boundaries[-1] >= min_frames:
+            boundaries.append(cut)
+
+    segments = []
+    for start_f, end_f in zip(boundaries[:-1], boundaries[1:]):
+        segments.append((start_f * frame_len, end_f * frame_len))
+    if not segments:
+        return [(0, total)]
+    # 마지막 프레임 나머지 샘플까지 포함
+    segments[-1] = (segments[-1][0], total)
+    return segments
@@ -0,0 +1,126 @@
+# langgraph_config/warmup.py
+# 시작 시 무거운 import / 모델 로드를 백그라운드에서 미리 해두는 단계
+# - import 는 가볍게 두고 (UI 가 바로 뜨도록) 실제 로드는 여기서 명시적으로
+# - 항목별 상태(pending / loading / ready / failed)와 걸린 시간을 조회 가능
+#
+#   start_warmup()            # 여러 번 불러도 한번만 실행
+#   get_warmup().status()     # {"ready": bool, "components": {...}}
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 미리 올릴 모델 (레지스트리 이름, 쉼표 구분)
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "vosk_en_us,tts_us,tts_uk").split(",") if m.strip()]
+# 실패해도 준비 완료로 보는 항목 (UK 음성이 없어도 US 채점은 됨)
+OPTIONAL_COMPONENTS = frozenset(m.strip() for m in os.getenv("WARMUP_OPTIONAL", "tts_uk").split(",") if m.strip())
+
+
+def _warm_graph():
+    from .builder import get_compiled_graph
+    get_compiled_graph()
+
+def _warm_audio():
+    # 리샘플링 / 압축 인코딩용 라이브러리 import
+    from .audio_ingest import SCIPY_AVAILABLE
+    if SCIPY_AVAILABLE:
+        import scipy.signal  # noqa: F401
+    from . import audio_transport  # noqa: F401
+
+def _warm_model(name: str):
+    def load():
+        from .model_registry import registry
+        registry.get(name)
+    return load
+
+def _warm_workers():
+    from .workers import get_inference_pool
+    get_inference_pool().warmup()
+
+
+def default_components():
+    """(이름, 함수) 목록 - 추론 워커를 쓰면 모델은 워커 프로세스에서 올림"""
+    from .workers import inference_pool_enabled
+    components = [("graph", _warm_graph), ("audio", _warm_audio)]
+    if inference_pool_enabled():
+        components.append(("workers", _warm_workers))
+    else:
+        components += [(name, _warm_model(name)) for name in WARMUP_MODELS]
+    return components
+
+
+class Warmup:
+    def __init__(self, components=None):
+        self._components = components
+        self._status = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._done = threading.Event()
+
+    def start(self):
+        """백그라운드 스레드에서 순서대로 로드 (이미 시작했으면 아무것도 안 함)"""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            if self._components is None:
+                self._components = default_components()
+            for name, _ in self._components:
+                self._status[name] = {"status": "pending", "seconds": None, "error": None,
+                                      "optional": name in OPTIONAL_COMPONENTS}
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        for name, fn in self._components:
+            self._set(name, status="loading")
+            started = time.perf_counter()
+            try:
+                fn()
+                self._set(name, status="ready", seconds=round(time.perf_counter() - started, 3))
+            except Exception as e:
+                # 하나가 실패해도 나머지는 계속 (예: Vosk 모델 폴더 없음)
+                self._set(name, status="failed", seconds=round(time.perf_counter() - started, 3),
+                          error=f"{type(e).__name__}: {e}")
+                print(f"[warmup] {name} failed: {e}")
+        self._done.set()
+
+    def _set(self, name, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    def status(self) -> dict:
+        with self._lock:
+            components = {name: dict(s) for name, s in self._status.items()}
+        return {
+            "started": self._thread is not None,
+            "finished": self._done.is_set(),
+            "ready": bool(components) and all(
+                s["status"] == "ready" or (s["optional"] and s["status"] == "failed")
+                for s in components.values()
+            ),
+            "components": components,
+        }
+
+    def is_ready(self) -> bool:
+        return self.status()["ready"]
+
+    def wait(self, timeout: float = None) -> bool:
+        """끝날 때까지 대기 (실패 항목이 있어도 끝나면 True)"""
+        return self._done.wait(timeout)
+
+
+# 프로세스 공용 warm-up (Streamlit 은 스크립트를 계속 다시 실행해서 한번만 시작되게)
+_warmup = None
+_warmup_lock = threading.Lock()
+
+def get_warmup() -> Warmup:
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup()
+    return _warmup
+
+def start_warmup() -> Warmup:
+    return get_warmup().start()
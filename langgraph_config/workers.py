@@ -0,0 +1,204 @@
+# langgraph_config/workers.py
+# 추론 전용 프로세스 풀 (GIL / torch 스레드 경쟁 없이 코어를 나눠서 사용)
+# - 워커마다 모델은 처음 한번만 로드 (model_registry), 코어/스레드 예산 고정
+# - 디코딩된 PCM 은 shared memory 로 넘김 (pickle 로 bytes 복사 X)
+# - INFERENCE_WORKERS > 0 이면 run_pipeline 이 여기로 보냄, 0 이면 지금처럼 같은 프로세스에서 실행
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from multiprocessing.util import Finalize
+
+import numpy as np
+
+from .audio_ingest import DecodedAudio
+
+# 워커 프로세스 수 (0 = 사용 안 함)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+# 워커당 torch/OpenMP 스레드 수 (기본: 코어 수 / 워커 수)
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "0"))
+# 워커마다 코어를 고정할지 (리눅스 sched_setaffinity)
+WORKER_PIN_CPUS = os.getenv("WORKER_PIN_CPUS", "1") == "1"
+# 워커 시작 시 모델 미리 로드
+WORKER_PRELOAD = os.getenv("WORKER_PRELOAD", "1") == "1"
+# torch 는 스레드가 떠 있는 프로세스에서 fork 하면 멈출 수 있어서 기본 spawn
+WORKER_START_METHOD = os.getenv("WORKER_START_METHOD", "spawn")
+
+# 미리 로드할 모델 (us/uk 튜터 + STT) - 하나씩 따로 시도해서 UK 음성이 실패해도 US 는 그대로
+# (실패한 모델은 레지스트리가 MODEL_RETRY_SEC 동안 다시 로드하지 않음)
+PRELOAD_MODELS = ("vosk_en_us", "tts_us", "tts_uk")
+
+
+def _available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def threads_per_worker(workers: int) -> int:
+    if WORKER_THREADS > 0:
+        return WORKER_THREADS
+    return max(1, len(_available_cpus()) // max(1, workers))
+
+def apply_thread_budget(threads: int, cpus=None):
+    """현재 프로세스의 연산 스레드 수 / 사용할 코어 제한 (torch import 전에 호출)"""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"[workers] sched_setaffinity failed: {e}")
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass   # torch 가 없거나 이미 interop 스레드가 떠 있음
+
+
+# ---------------- 워커 프로세스 쪽 ----------------
+def _init_worker(counter, threads: int, pin: bool, preload: bool):
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    cpus = None
+    if pin:
+        available = _available_cpus()
+        start = (index * threads) % len(available)
+        cpus = {available[(start + k) % len(available)] for k in range(threads)}
+    apply_thread_budget(threads, cpus)
+
+    # 워커마다 자기 프로파일 기록만 있어서 export 파일 / label 을 따로 (워커 번호라 재시작해도 같은 파일)
+    # (fork 로 뜬 워커는 부모 기록을 복사해서 가져와서 비우고 시작)
+    from .profiling import profiler
+    profiler.reset()
+    profiler.process = f"worker{index}"
+
+    # 워커는 os._exit 로 끝나서 atexit 이 안 돎 → 결과 저장소 flush 를 종료 finalizer 로
+    Finalize(None, _flush_results, exitpriority=10)
+
+    if preload:
+        from .model_registry import registry
+        for name in PRELOAD_MODELS:
+            try:
+                registry.get(name)
+            except Exception as e:
+                print(f"[workers] preload {name} failed: {e}")
+    print(f"[workers] worker {index} ready (pid={os.getpid()}, threads={threads}, cpus={sorted(cpus) if cpus else 'all'})")
+
+def _flush_results():
+    from . import results_store
+    if results_store._results_store is not None:
+        results_store._results_store.flush(5.0)
+
+def _ping() -> int:
+    return os.getpid()
+
+def _pipeline_task(handle: dict, user_name: str, target_text: str, request_id: str):
+    """shared memory 의 PCM 으로 그래프 실행 (복사 없이 버퍼를 그대로 읽음)"""
+    from .graph_runner import run_pipeline_local
+
+    # 워커는 부모와 같은 resource tracker 를 써서 그냥 붙기만 하면 됨 (unlink 는 부모가)
+    shm = shared_memory.SharedMemory(name=handle["name"])
+    try:
+        pcm = np.ndarray((handle["num_samples"],), dtype=np.int16, buffer=shm.buf)
+        pcm.flags.writeable = False
+        user_audio = DecodedAudio(pcm=pcm, sample_rate=handle["sample_rate"])
+        user_audio._hash = handle["hash"]   # 부모에서 계산한 해시 재사용
+        del pcm
+        return run_pipeline_local(user_name, target_text, request_id, user_audio=user_audio)
+    finally:
+        user_audio = None
+        try:
+            shm.close()
+        except BufferError:
+            pass   # 아직 참조가 남아 있으면 GC 때 해제
+
+
+# ---------------- 부모 프로세스 쪽 ----------------
+class InferencePool:
+    def __init__(self, workers: int = INFERENCE_WORKERS, threads: int = None,
+                 pin: bool = WORKER_PIN_CPUS, preload: bool = WORKER_PRELOAD):
+        self.workers = workers
+        self.threads = threads or threads_per_worker(workers)
+        self.pin = pin
+        self.preload = preload
+        self._ctx = mp.get_context(WORKER_START_METHOD)
+        self._counter = self._ctx.Value("i", 0)
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._ctx,
+            initializer=_init_worker,
+            initargs=(self._counter, self.threads, self.pin, self.preload),
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """워커가 죽어서(OOM 등) 풀이 깨지면 새 풀로 교체 (동시에 여러 요청이 알아채도 한번만)"""
+        with self._lock:
+            if self._executor is broken:
+                print("[workers] inference pool broken, restarting workers")
+                broken.shutdown(wait=False)
+                with self._counter.get_lock():
+                    self._counter.value = 0
+                self._executor = self._new_executor()
+
+    def run_pipeline(self, user_audio: DecodedAudio, user_name: str, target_text: str, request_id: str) -> dict:
+        """PCM 을 shared memory 에 한번 복사해서 워커로 넘기고 결과 대기"""
+        pcm = np.ascontiguousarray(user_audio.pcm, dtype=np.int16)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, pcm.nbytes))
+        try:
+            np.ndarray(pcm.shape, dtype=np.int16, buffer=shm.buf)[:] = pcm
+            handle = {
+                "name": shm.name,
+                "num_samples": int(pcm.shape[0]),
+                "sample_rate": user_audio.sample_rate,
+                "hash": user_audio.content_hash(),
+            }
+            executor = self._executor
+            try:
+                return executor.submit(_pipeline_task, handle, user_name, target_text, request_id).result()
+            except BrokenProcessPool:
+                self._restart(executor)
+                raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def warmup(self, timeout: float = None) -> int:
+        """워커를 전부 띄우고 모델 preload 가 끝날 때까지 대기 (준비된 워커 수 리턴)"""
+        # 워커는 submit 할 때 하나씩 뜨니까 워커 수만큼 동시에 제출
+        futures = [self._executor.submit(_ping) for _ in range(self.workers)]
+        return len({f.result(timeout) for f in futures})
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+# 프로세스 공용 풀 (처음 호출 시 생성)
+_inference_pool = None
+_inference_pool_lock = threading.Lock()
+
+def inference_pool_enabled() -> bool:
+    return INFERENCE_WORKERS > 0
+
+def get_inference_pool() -> InferencePool:
+    global _inference_pool
+    if _inference_pool is None:
+        with _inference_pool_lock:
+            if _inference_pool is None:
+                _inference_pool = InferencePool()
+    return _inference_pool
+
+def shutdown_inference_pool(wait: bool = True):
+    global _inference_pool
+    with _inference_pool_lock:
+        if _inference_pool is not None:
+            _inference_pool.shutdown(wait=wait)
+            _inference_pool = None